@@ -5,12 +5,13 @@ from typing import List, Generator, Optional
 from dotenv import load_dotenv
 from openai import OpenAI
 import os
-import sqlite3
-from datetime import datetime
-import pytz
 import logging
 import re
 
+from clock import clock_for
+from db_executor import DatabaseBusyError
+from timetable_store import get_store, read_store
+
 # ============ SETUP ============
 
 load_dotenv()
@@ -20,8 +21,6 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Constants
-TIMEZONE = "Asia/Kolkata"
-DATABASE = "timetable.db"
 MODEL_ID = "nvidia/llama-3.1-nemotron-ultra-253b-v1"
 
 # NVIDIA/OpenAI client
@@ -50,30 +49,25 @@ class AIResponse(BaseModel):
 # ============ UTILITIES ============
 
 def get_current_period(class_name: str) -> str:
+    # Same store and clock as /get_current_period, so the shortcut and the API always agree.
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-
-        india_time = datetime.now(pytz.timezone(TIMEZONE))
-        current_day = india_time.strftime("%A")
-        current_time = india_time.strftime("%H:%M")
-
-        cursor.execute("""
-            SELECT subject FROM timetable
-            WHERE class = ? AND day = ? AND start_time <= ? AND end_time >= ?
-        """, (class_name, current_day, current_time, current_time))
-
-        result = cursor.fetchone()
-        conn.close()
-
-        if result:
-            return f"The current period for class {class_name} is: 📚 {result[0]}"
-        elif current_day.lower() == "sunday":
-            return "📅 Today is Sunday! No school today."
+        store = get_store()
+        resolved = store.resolve_class(class_name)
+        if resolved is None:
+            return f"🔍 Class {class_name} is not in the timetable."
+
+        now = clock_for(store.timezone_for(resolved)).now()
+        effective = store.today(resolved, now)
+        current = effective.schedule.now(now.minute).current
+
+        if effective.holiday is not None:
+            return f"📅 Today is {effective.holiday}! No school today."
+        elif current:
+            return f"The current period for class {resolved} is: 📚 {current.subject}"
         else:
-            return f"🔍 No ongoing period found for class {class_name} at {current_time}."
+            return f"🔍 No ongoing period found for class {resolved} at {now.time_str}."
     except Exception as e:
-        logger.error(f"Database error: {str(e)}")
+        logger.error(f"Timetable lookup error: {str(e)}")
         return "⚠️ Failed to fetch period info."
 
 def build_messages(prompt: str, system_msg: str) -> List[dict]:
@@ -95,7 +89,7 @@ async def chat_with_nvidia(request: PromptRequest):
         if "current period" in request.prompt.lower() and "class" in request.prompt.lower():
             class_name = extract_class_name(request.prompt)
             if class_name:
-                return {"response": get_current_period(class_name)}
+                return {"response": await read_store(get_current_period, class_name)}
 
         messages = build_messages(
             prompt=request.prompt,
@@ -139,6 +133,8 @@ async def chat_with_nvidia(request: PromptRequest):
 
         return {"response": response_text.strip()}
 
+    except DatabaseBusyError:
+        raise  # answered with 503 by main.py
     except Exception as e:
         logger.exception("AI Chat Error")
         raise HTTPException(status_code=500, detail=f"AI Chat Error: {str(e)}")
@@ -0,0 +1,90 @@
+from typing import List, NamedTuple, Tuple
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+import os
+import sys
+import time
+
+# === Constants ===
+DEFAULT_TIMEZONE = os.getenv("SCHOOL_TIMEZONE", "Asia/Kolkata")
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+SECONDS_PER_DAY = 86400
+# 1970-01-01 was a Thursday.
+EPOCH_WEEKDAY = 3
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+TIME_STRINGS: List[str] = [sys.intern(f"{m // 60:02d}:{m % 60:02d}") for m in range(24 * 60)]
+
+# === Snapshot ===
+class ClockSnapshot(NamedTuple):
+    """One reading of a school clock, taken once per request."""
+    timestamp: float     # POSIX seconds
+    day: str             # "Monday" ... "Sunday"
+    date: str            # local calendar date, "YYYY-MM-DD"
+    minute: int          # minute of the local day, 0-1439
+    time_str: str        # "HH:MM"
+    seconds: float       # seconds into the local day
+
+    def seconds_until(self, minute: int) -> float:
+        return minute * 60 - self.seconds
+
+# === Zone Clock ===
+class ZoneClock:
+    """Local time for one timezone by plain arithmetic on the UTC offset.
+
+    The offset is resolved through zoneinfo once per UTC day and cached
+    together with the window it is valid for. A day containing a DST
+    transition is split at the transition minute, so every reading is
+    an offset lookup, one addition and a few integer divisions.
+    """
+
+    def __init__(self, tz: ZoneInfo):
+        self.tz = tz
+        self._window: Tuple[float, float, int] = (0.0, 0.0, 0)
+        self._date: Tuple[int, str] = (-1, "")
+
+    def _utcoffset(self, timestamp: float) -> int:
+        return int(datetime.fromtimestamp(timestamp, timezone.utc).astimezone(self.tz).utcoffset().total_seconds())
+
+    def _offset_window(self, timestamp: float) -> Tuple[float, float, int]:
+        start = timestamp - timestamp % SECONDS_PER_DAY
+        end = start + SECONDS_PER_DAY
+        first, last = self._utcoffset(start), self._utcoffset(end - 1)
+        if first == last:
+            return start, end, first
+        # Binary search the first minute on the new offset.
+        lo, hi = 0, SECONDS_PER_DAY // 60
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._utcoffset(start + mid * 60) == last:
+                hi = mid
+            else:
+                lo = mid + 1
+        switch = start + lo * 60
+        return (start, switch, first) if timestamp < switch else (switch, end, last)
+
+    def at(self, timestamp: float) -> ClockSnapshot:
+        window = self._window
+        if not window[0] <= timestamp < window[1]:
+            window = self._window = self._offset_window(timestamp)
+        local = timestamp + window[2]
+        days, seconds = divmod(local, SECONDS_PER_DAY)
+        days = int(days)
+        cached = self._date
+        if cached[0] != days:
+            cached = self._date = (days, date.fromordinal(days + EPOCH_ORDINAL).isoformat())
+        minute = int(seconds // 60)
+        return ClockSnapshot(timestamp, DAY_NAMES[(days + EPOCH_WEEKDAY) % 7], cached[1], minute,
+                             TIME_STRINGS[minute], seconds)
+
+    def now(self) -> ClockSnapshot:
+        return self.at(time.time())
+
+# === Registry ===
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    return ZoneInfo(name)
+
+@lru_cache(maxsize=None)
+def clock_for(name: str = DEFAULT_TIMEZONE) -> ZoneClock:
+    return ZoneClock(get_zone(name))
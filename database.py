@@ -1,76 +1,211 @@
+import json
 import sqlite3
-from datetime import datetime
-import pytz
-from typing import Optional, List, Tuple
+import time
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, List, Tuple
+
+from clock import clock_for
+from db_pool import ConnectionPool, get_pool
+from timetable_index import iter_classes, normalize_day, parse_minutes
+from timetable_validate import check_timetable
 
 DB_NAME = "timetable.db"
 
+
+# ========== SCHEMA MIGRATIONS ==========
+# PRAGMA user_version records the last migration applied to a database file.
+def _create_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS timetable (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            class TEXT NOT NULL,
+            day TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            subject TEXT NOT NULL
+        )
+    """)
+
+
+def _add_minute_columns(conn: sqlite3.Connection):
+    # Integer minute-of-day columns, backfilled from the "HH:MM" text, plus an index that
+    # covers every read below so lookups are one B-tree seek as the table grows.
+    conn.execute("ALTER TABLE timetable ADD COLUMN start_min INTEGER")
+    conn.execute("ALTER TABLE timetable ADD COLUMN end_min INTEGER")
+    conn.execute("""
+        UPDATE timetable SET
+            start_min = CAST(substr(start_time, 1, instr(start_time, ':') - 1) AS INTEGER) * 60
+                      + CAST(substr(start_time, instr(start_time, ':') + 1) AS INTEGER),
+            end_min = CAST(substr(end_time, 1, instr(end_time, ':') - 1) AS INTEGER) * 60
+                    + CAST(substr(end_time, instr(end_time, ':') + 1) AS INTEGER)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_timetable_class_day_time
+        ON timetable (class, day, start_min, end_min, subject)
+    """)
+    conn.execute("ANALYZE timetable")
+
+
+def _add_revision_counter(conn: sqlite3.Connection):
+    # A single-row counter that every write below bumps, so readers (timetable_store.SqliteStore)
+    # can tell with one primary-key read whether anything they cached is stale.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS timetable_revision (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            revision INTEGER NOT NULL
+        )
+    """)
+    conn.execute("INSERT OR IGNORE INTO timetable_revision (id, revision) VALUES (1, 0)")
+
+
+def _add_subject_index(conn: sqlite3.Connection):
+    # Subject search reads the distinct subjects and then their rows, both from this index.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_timetable_subject
+        ON timetable (subject, class, day, start_min, end_min)
+    """)
+    conn.execute("ANALYZE timetable")
+
+
+MIGRATIONS: Dict[int, Callable[[sqlite3.Connection], None]] = {
+    1: _create_table,
+    2: _add_minute_columns,
+    3: _add_revision_counter,
+    4: _add_subject_index,
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+
+def migrate(conn: sqlite3.Connection):
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    # BEGIN IMMEDIATE serialises concurrent first connections; re-read the version under the lock.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target in range(version + 1, SCHEMA_VERSION + 1):
+            MIGRATIONS[target](conn)
+            conn.execute(f"PRAGMA user_version = {target}")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# Every function below shares this pool: one long-lived, migrated connection per thread.
+pool = get_pool(DB_NAME, setup=migrate)
+
+
+def bump_revision(conn: sqlite3.Connection):
+    # Once per write transaction rather than a per-row trigger, which would halve bulk-import speed.
+    conn.execute("UPDATE timetable_revision SET revision = revision + 1 WHERE id = 1")
+
+
 # ========== DATABASE SETUP ==========
 def init_db():
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS timetable (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                class TEXT NOT NULL,
-                day TEXT NOT NULL,
-                start_time TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                subject TEXT NOT NULL
-            )
-        """)
-        conn.commit()
+    # Connecting applies any pending migrations.
+    pool.connection()
 
 
 # ========== INSERT ==========
 def add_period(class_name: str, day: str, start_time: str, end_time: str, subject: str):
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO timetable (class, day, start_time, end_time, subject)
-            VALUES (?, ?, ?, ?, ?)
-        """, (class_name, day.capitalize(), start_time, end_time, subject))
-        conn.commit()
+    with pool.transaction() as conn:
+        conn.execute("""
+            INSERT INTO timetable (class, day, start_time, end_time, subject, start_min, end_min)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (class_name, day.capitalize(), start_time, end_time, subject,
+              parse_minutes(start_time), parse_minutes(end_time)))
+        bump_revision(conn)
+
+
+# ========== BULK IMPORT ==========
+class ImportReport(NamedTuple):
+    classes: int
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else float(self.rows)
+
+
+def _timetable_rows(data: Dict[str, Any]) -> Iterator[Tuple]:
+    for class_name, spec in iter_classes(data):
+        for day, periods in spec.get("daily_schedule", {}).items():
+            day = normalize_day(day)
+            for p in periods:
+                yield (class_name, day, p["start_time"], p["end_time"], p["subject"],
+                       parse_minutes(p["start_time"]), parse_minutes(p["end_time"]))
+
+
+def import_timetable(data: Dict[str, Any], replace: bool = False,
+                     target: Optional[ConnectionPool] = None) -> ImportReport:
+    # One validated pass, one transaction, one executemany: a single commit for the whole load.
+    # With replace=True every class in `data` first loses its existing rows.
+    check_timetable(data)
+    classes = [class_name for class_name, _ in iter_classes(data)]
+    started = time.perf_counter()
+    with (target or pool).transaction() as conn:
+        if replace:
+            conn.executemany("DELETE FROM timetable WHERE class = ?", [(c,) for c in classes])
+        cursor = conn.executemany("""
+            INSERT INTO timetable (class, day, start_time, end_time, subject, start_min, end_min)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, _timetable_rows(data))
+        rows = cursor.rowcount
+        bump_revision(conn)
+    return ImportReport(len(classes), rows, time.perf_counter() - started)
+
+
+def import_timetable_file(path: str, replace: bool = False,
+                          target: Optional[ConnectionPool] = None) -> ImportReport:
+    with open(path, "r") as f:
+        return import_timetable(json.load(f), replace, target)
 
 
 # ========== FETCH ==========
+# Times are re-rendered from the integer columns so both queries are answered from the index alone.
 def get_timetable(class_name: str, day: Optional[str] = None) -> List[Tuple]:
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        if day:
-            cursor.execute("""
-                SELECT day, start_time, end_time, subject
-                FROM timetable
-                WHERE class = ? AND day = ?
-                ORDER BY start_time
-            """, (class_name, day.capitalize()))
-        else:
-            cursor.execute("""
-                SELECT day, start_time, end_time, subject
-                FROM timetable
-                WHERE class = ?
-                ORDER BY day, start_time
-            """, (class_name,))
-        return cursor.fetchall()
+    cursor = pool.connection().cursor()
+    if day:
+        cursor.execute("""
+            SELECT day, printf('%02d:%02d', start_min / 60, start_min % 60),
+                   printf('%02d:%02d', end_min / 60, end_min % 60), subject
+            FROM timetable
+            WHERE class = ? AND day = ?
+            ORDER BY start_min
+        """, (class_name, day.capitalize()))
+    else:
+        cursor.execute("""
+            SELECT day, printf('%02d:%02d', start_min / 60, start_min % 60),
+                   printf('%02d:%02d', end_min / 60, end_min % 60), subject
+            FROM timetable
+            WHERE class = ?
+            ORDER BY day, start_min
+        """, (class_name,))
+    return cursor.fetchall()
+
+
+def current_subject(class_name: str, day: str, minute: int) -> Optional[str]:
+    # Seek to the last period starting at or before `minute`, then check it is still running.
+    row = pool.connection().execute("""
+        SELECT subject, end_min FROM timetable
+        WHERE class = ? AND day = ? AND start_min <= ?
+        ORDER BY start_min DESC
+        LIMIT 1
+    """, (class_name, day, minute)).fetchone()
+    return row[0] if row and row[1] > minute else None
 
 
 # ========== CURRENT PERIOD ==========
 def get_current_period(class_name: str) -> str:
-    india_time = datetime.now(pytz.timezone("Asia/Kolkata"))
-    current_day = india_time.strftime("%A")
-    current_time = india_time.strftime("%H:%M")
-
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT subject FROM timetable
-            WHERE class = ? AND day = ? AND start_time <= ? AND end_time >= ?
-        """, (class_name, current_day, current_time, current_time))
+    now = clock_for().now()
+    current_day = now.day
+    current_time = now.time_str
 
-        result = cursor.fetchone()
+    subject = current_subject(class_name, current_day, now.minute)
 
-    if result:
-        return f"🕒 Current period for class {class_name} is: {result[0]}"
+    if subject:
+        return f"🕒 Current period for class {class_name} is: {subject}"
     elif current_day.lower() == "sunday":
         return f"🎉 Sunday! No classes today."
     else:
@@ -79,15 +214,37 @@ def get_current_period(class_name: str) -> str:
 
 # ========== DELETE ==========
 def delete_period_by_id(period_id: int) -> bool:
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM timetable WHERE id = ?", (period_id,))
+    with pool.transaction() as conn:
+        cursor = conn.execute("DELETE FROM timetable WHERE id = ?", (period_id,))
+        if cursor.rowcount:
+            bump_revision(conn)
         return cursor.rowcount > 0
 
 
 # ========== LIST CLASSES ==========
 def list_classes() -> List[str]:
-    with sqlite3.connect(DB_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT class FROM timetable")
-        return [row[0] for row in cursor.fetchall()]
+    cursor = pool.connection().cursor()
+    cursor.execute("SELECT DISTINCT class FROM timetable")
+    return [row[0] for row in cursor.fetchall()]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from timetable_validate import ERROR, TimetableValidationError
+
+    parser = argparse.ArgumentParser(description="Bulk-load timetable.json into SQLite.")
+    parser.add_argument("source", nargs="?", default="timetable.json")
+    parser.add_argument("--db", default=DB_NAME, help="SQLite file to load into")
+    parser.add_argument("--replace", action="store_true", help="replace the existing rows of every imported class")
+    args = parser.parse_args()
+    try:
+        report = import_timetable_file(args.source, args.replace, get_pool(args.db, setup=migrate))
+    except TimetableValidationError as e:
+        for issue in e.issues:
+            if issue.level == ERROR:
+                print(f"❌ {issue}")
+        sys.exit(1)
+    print(f"✅ Imported {report.rows} rows for {report.classes} classes in {report.seconds:.2f}s "
+          f"({report.rows_per_second:,.0f} rows/s)")
@@ -0,0 +1,145 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# === Settings ===
+DB_WORKERS = int(os.getenv("SQLITE_WORKERS", "4"))
+DB_QUEUE_SIZE = int(os.getenv("SQLITE_QUEUE_SIZE", "64"))
+
+class DatabaseBusyError(RuntimeError):
+    """The DB queue is full; callers answer 503 rather than let latency grow."""
+
+class _Job(NamedTuple):
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    future: "asyncio.Future[Any]"
+    loop: asyncio.AbstractEventLoop
+    queued_at: float
+
+def _resolve(future: "asyncio.Future[Any]", result: Any, error: Optional[BaseException]) -> None:
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+# === Executor ===
+class DatabaseExecutor:
+    """Runs blocking database calls for async handlers on a few dedicated threads.
+
+    Each worker keeps its own pooled SQLite connection for life, so the
+    number of open connections is the number of workers. Jobs wait in a
+    bounded FIFO; when it is full ``run`` raises DatabaseBusyError at once
+    instead of letting the backlog grow. ``stats`` reports queue depth,
+    wait and run times for /db_status.
+    """
+
+    def __init__(self, workers: int = DB_WORKERS, queue_size: int = DB_QUEUE_SIZE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._peak_queued = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    # === Lifecycle ===
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._work, name=f"db-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            threads = list(self._threads)
+        for thread in threads:
+            thread.start()
+
+    def stop(self) -> None:
+        # Queued jobs still run; each worker exits at its sentinel.
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    # === Submission ===
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if not self._threads:
+            self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait(_Job(fn, args, future, loop, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise DatabaseBusyError(f"Database queue is full ({self.queue_size} calls waiting)")
+        depth = self._queue.qsize()
+        with self._lock:
+            self._peak_queued = max(self._peak_queued, depth)
+        return await future
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            started = time.perf_counter()
+            with self._lock:
+                self._active += 1
+                self._wait_seconds += started - job.queued_at
+            result, error = None, None
+            try:
+                result = job.fn(*job.args)
+            except Exception as e:
+                error = e
+            with self._lock:
+                self._active -= 1
+                self._run_seconds += time.perf_counter() - started
+                if error is None:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+            try:
+                job.loop.call_soon_threadsafe(_resolve, job.future, result, error)
+            except RuntimeError:
+                logger.warning("Event loop closed before a database call returned")
+
+    # === Metrics ===
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "workers": len(self._threads),
+                "queue_size": self.queue_size,
+                "queued": self._queue.qsize(),
+                "peak_queued": self._peak_queued,
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_seconds * 1000 / finished, 3) if finished else 0.0,
+                "avg_run_ms": round(self._run_seconds * 1000 / finished, 3) if finished else 0.0,
+            }
+
+# Shared by every async caller; started in main.py's lifespan (or lazily on first use).
+db_executor = DatabaseExecutor()
@@ -0,0 +1,100 @@
+from typing import Callable, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# === Settings ===
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# === Pool ===
+class ConnectionPool:
+    """One long-lived, pre-configured sqlite3 connection per thread.
+
+    SQLite connections are cheap to keep and expensive to open, and a
+    connection must not be shared between threads mid-statement, so every
+    worker thread lazily opens its own and reuses it for the life of the
+    thread. Each connection runs in WAL mode with synchronous=NORMAL, a
+    memory map and a larger prepared-statement cache.
+
+    ``setup`` runs on every new connection after the PRAGMAs; database.py
+    uses it to apply schema migrations before the first query.
+    """
+
+    def __init__(self, path: str, setup: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.path = path
+        self.setup = setup
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread is off only so close_all can run at shutdown; use stays per thread.
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=CACHED_STATEMENTS,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        if self.setup is not None:
+            self.setup(conn)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        # Commits on success and rolls back on error, without closing the connection.
+        conn = self.connection()
+        with conn:
+            yield conn
+
+    def close_all(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not close SQLite connection to {self.path}: {e}")
+        # Threads that come back after shutdown reconnect instead of using a closed handle.
+        self._local = threading.local()
+
+    @property
+    def size(self) -> int:
+        return len(self._connections)
+
+# === Registry ===
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(path: str, setup: Optional[Callable[[sqlite3.Connection], None]] = None) -> ConnectionPool:
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path, setup)
+        elif setup is not None and pool.setup is None:
+            pool.setup = setup
+        return pool
+
+def close_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
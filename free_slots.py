@@ -0,0 +1,67 @@
+from typing import Iterable, Iterator, List, Sequence, Tuple
+from heapq import merge
+
+from timetable_index import DaySchedule
+
+Interval = Tuple[int, int]  # [start, end) in minutes of the day
+
+BREAK_WORDS = ("break", "lunch", "recess")
+
+def is_break(subject: str) -> bool:
+    subject = subject.casefold()
+    return any(word in subject for word in BREAK_WORDS)
+
+def class_intervals(schedule: DaySchedule, breaks: bool) -> List[Interval]:
+    """Teaching (or, with ``breaks``, break) intervals of one class-day, sorted and coalesced."""
+    merged: List[Interval] = []
+    for period, start, end in zip(schedule.periods, schedule.starts, schedule.ends):
+        if is_break(period.subject) != breaks or end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def _events(intervals: Sequence[Interval]) -> Iterator[Tuple[int, int]]:
+    # Ends sort before starts at the same minute, so back-to-back periods never count twice.
+    for start, end in intervals:
+        yield start, 1
+        yield end, -1
+
+def sweep(interval_lists: Iterable[Sequence[Interval]], lo: int, hi: int, want: int,
+          min_minutes: int = 1) -> List[Interval]:
+    """Windows inside [lo, hi) where exactly ``want`` of the interval lists are active.
+
+    Every list is already sorted, so the per-list event streams are combined
+    with a k-way heap merge: O(E log k) for E events over k classes.
+    """
+    windows: List[Interval] = []
+    count = 0
+    cursor = lo
+    for minute, delta in merge(*(_events(intervals) for intervals in interval_lists)):
+        if minute > cursor:
+            if count == want:
+                _emit(windows, max(cursor, lo), min(minute, hi))
+            cursor = minute
+        count += delta
+    if count == want:
+        _emit(windows, max(cursor, lo), hi)
+    return [w for w in windows if w[1] - w[0] >= min_minutes]
+
+def _emit(windows: List[Interval], start: int, end: int) -> None:
+    if start >= end:
+        return
+    if windows and windows[-1][1] == start:
+        windows[-1] = (windows[-1][0], end)
+    else:
+        windows.append((start, end))
+
+def free_windows(schedules: Sequence[DaySchedule], lo: int, hi: int, min_minutes: int = 1) -> List[Interval]:
+    # No class is being taught; breaks count as free time.
+    return sweep([class_intervals(s, breaks=False) for s in schedules], lo, hi, 0, min_minutes)
+
+def break_windows(schedules: Sequence[DaySchedule], lo: int, hi: int, min_minutes: int = 1) -> List[Interval]:
+    # Every class is on a break at the same time.
+    return sweep([class_intervals(s, breaks=True) for s in schedules], lo, hi, len(schedules), min_minutes)
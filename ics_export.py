@@ -0,0 +1,187 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+import re
+
+from clock import get_zone
+from timetable_index import DAYS, Period, TimetableIndex, parse_minutes
+
+# === RFC 5545 Basics ===
+PRODID = "-//Smart School AI//Timetable//EN"
+BYDAY = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+CRLF = "\r\n"
+FOOTER = b"END:VCALENDAR\r\n"
+UID_DOMAIN = "smart-school"
+
+def escape_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+def fold(line: str) -> str:
+    # Content lines are limited to 75 octets; continuations start with one space.
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line + CRLF
+    parts: List[bytes] = []
+    limit = 75
+    while len(raw) > limit:
+        cut = limit
+        while (raw[cut] & 0xC0) == 0x80:  # never split a UTF-8 sequence
+            cut -= 1
+        parts.append(raw[:cut])
+        raw = raw[cut:]
+        limit = 74
+    parts.append(raw)
+    return (CRLF + " ").join(p.decode("utf-8") for p in parts) + CRLF
+
+def render(lines: Iterable[str]) -> str:
+    return "".join(fold(line) for line in lines)
+
+def local_stamp(on: date, minutes: int) -> str:
+    return f"{on:%Y%m%d}T{minutes // 60:02d}{minutes % 60:02d}00"
+
+def utc_stamp(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def slug(value: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "-", value).strip("-") or "class"
+
+# === VTIMEZONE ===
+def _offset(seconds: int) -> str:
+    sign = "+" if seconds >= 0 else "-"
+    seconds = abs(seconds)
+    return f"{sign}{seconds // 3600:02d}{seconds % 3600 // 60:02d}"
+
+@lru_cache(maxsize=None)
+def vtimezone(name: str, year: int) -> str:
+    """VTIMEZONE for ``name`` covering ``year`` and the next, derived from zoneinfo."""
+    tz = get_zone(name)
+
+    def at(ts: float) -> datetime:
+        return datetime.fromtimestamp(ts, tz)
+
+    start = datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()
+    first = at(start)
+    observances: List[Tuple[str, str, int, int, str]] = [
+        ("STANDARD" if not first.dst() else "DAYLIGHT", f"{year}0101T000000",
+         int(first.utcoffset().total_seconds()), int(first.utcoffset().total_seconds()), first.tzname() or name)
+    ]
+    # Daily probes find each transition day; a binary search finds its minute.
+    for day in range(1, 2 * 366):
+        lo_ts, hi_ts = start + (day - 1) * 86400, start + day * 86400
+        before, after = at(lo_ts).utcoffset(), at(hi_ts).utcoffset()
+        if before == after:
+            continue
+        lo, hi = 0, 1440
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if at(lo_ts + mid * 60).utcoffset() == after:
+                hi = mid
+            else:
+                lo = mid + 1
+        switch = at(lo_ts + lo * 60)
+        from_seconds, to_seconds = int(before.total_seconds()), int(after.total_seconds())
+        # DTSTART is the onset in the local time that was in force just before it.
+        onset = datetime.fromtimestamp(lo_ts + lo * 60 + from_seconds, timezone.utc)
+        observances.append(("DAYLIGHT" if switch.dst() else "STANDARD", onset.strftime("%Y%m%dT%H%M%S"),
+                            from_seconds, to_seconds, switch.tzname() or name))
+
+    lines = ["BEGIN:VTIMEZONE", f"TZID:{name}"]
+    for kind, onset, from_seconds, to_seconds, tzname in observances:
+        lines += [
+            f"BEGIN:{kind}",
+            f"DTSTART:{onset}",
+            f"TZOFFSETFROM:{_offset(from_seconds)}",
+            f"TZOFFSETTO:{_offset(to_seconds)}",
+            f"TZNAME:{escape_text(tzname)}",
+            f"END:{kind}",
+        ]
+    lines.append("END:VTIMEZONE")
+    return render(lines)
+
+def calendar_header(title: str, zones: Iterable[str], year: int) -> bytes:
+    zones = list(dict.fromkeys(zones))
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(title)}",
+    ]
+    if zones:
+        lines.append(f"X-WR-TIMEZONE:{zones[0]}")
+    return (render(lines) + "".join(vtimezone(zone, year) for zone in zones)).encode("utf-8")
+
+# === Events ===
+def period_event(uid: str, tzid: str, on: date, period: Period, class_name: str, dtstamp: str,
+                 rrule: Optional[str] = None, exdates: Iterable[date] = ()) -> List[str]:
+    start, end = parse_minutes(period.start_time), parse_minutes(period.end_time)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART;TZID={tzid}:{local_stamp(on, start)}",
+        f"DTEND;TZID={tzid}:{local_stamp(on, end)}",
+        f"SUMMARY:{escape_text(f'{period.subject} ({class_name})')}",
+    ]
+    if rrule:
+        lines.append(rrule)
+    exdates = list(exdates)
+    if exdates:
+        lines.append(f"EXDATE;TZID={tzid}:" + ",".join(local_stamp(d, start) for d in exdates))
+    if period.room:
+        lines.append(f"LOCATION:{escape_text(period.room)}")
+    if period.teacher:
+        lines.append(f"DESCRIPTION:{escape_text(f'Teacher: {period.teacher}')}")
+    lines += [f"CATEGORIES:{escape_text(class_name)}", "END:VEVENT"]
+    return lines
+
+def class_events(index: TimetableIndex, class_name: str, anchor: date, dtstamp: str) -> bytes:
+    """Every VEVENT for one class: weekly RRULE series from ``anchor`` (a Monday) plus calendar overrides.
+
+    A date changed by the calendar overlay is excluded from that weekday's
+    series with EXDATE and published as one-off events (or an all-day
+    holiday) instead.
+    """
+    tzid = index.timezone_for(class_name)
+    prefix = slug(class_name)
+    lines: List[str] = []
+    changed: Dict[str, List[date]] = {}
+
+    for iso in sorted(index.calendar):
+        on = date.fromisoformat(iso)
+        if on < anchor:
+            continue
+        day = DAYS[on.weekday()]
+        effective = index.effective_day(class_name, iso, day)
+        if effective.note is None:
+            continue  # no entry on this date applies to this class
+        changed.setdefault(day, []).append(on)
+        if effective.holiday is not None:
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{prefix}-{on:%Y%m%d}-holiday@{UID_DOMAIN}",
+                f"DTSTAMP:{dtstamp}",
+                f"DTSTART;VALUE=DATE:{on:%Y%m%d}",
+                f"DTEND;VALUE=DATE:{on + timedelta(days=1):%Y%m%d}",
+                f"SUMMARY:{escape_text(f'🎉 {effective.holiday}')}",
+                "TRANSP:TRANSPARENT",
+                f"CATEGORIES:{escape_text(class_name)}",
+                "END:VEVENT",
+            ]
+            continue
+        for period in effective.schedule.periods:
+            uid = f"{prefix}-{on:%Y%m%d}-{period.start_time.replace(':', '')}@{UID_DOMAIN}"
+            lines += period_event(uid, tzid, on, period, class_name, dtstamp)
+
+    for weekday, day in enumerate(DAYS):
+        weekly = index.weekly_day(class_name, day)
+        if weekly.holiday is not None or not weekly.schedule.periods:
+            continue
+        first = anchor + timedelta(days=weekday)
+        for period in weekly.schedule.periods:
+            uid = f"{prefix}-{BYDAY[weekday]}-{period.start_time.replace(':', '')}@{UID_DOMAIN}"
+            lines += period_event(uid, tzid, first, period, class_name, dtstamp,
+                                  rrule=f"RRULE:FREQ=WEEKLY;BYDAY={BYDAY[weekday]}",
+                                  exdates=changed.get(day, ()))
+    return render(lines).encode("utf-8")
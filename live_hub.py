@@ -0,0 +1,172 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import json
+import logging
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from db_executor import DatabaseBusyError
+from period_events import Offload, PeriodScheduler, push_latest
+from timetable_index import TimetableIndex
+from timetable_store import TimetableStore
+
+logger = logging.getLogger(__name__)
+
+SEND_QUEUE_SIZE = 32
+
+def encode_frame(event_type: str, **fields: Any) -> str:
+    return json.dumps({"type": event_type, **fields}, ensure_ascii=False, separators=(",", ":"))
+
+# === Client ===
+class LiveClient:
+    __slots__ = ("websocket", "queue", "classes")
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.classes: Set[str] = set()
+
+# === Hub ===
+class LiveHub:
+    """Multiplexed WebSocket fan-out for period changes, reloads and announcements.
+
+    Every event is encoded to a single text frame and the same string is
+    queued for every interested socket. Each socket drains its own bounded
+    queue in a sender task, so a slow kiosk drops its oldest frames instead
+    of stalling the fan-out.
+    """
+
+    def __init__(self, get_store: Callable[[], TimetableStore], scheduler: PeriodScheduler,
+                 offload: Optional[Offload] = None):
+        self.get_store = get_store
+        self.scheduler = scheduler
+        self.offload = offload
+        self._clients: Set[LiveClient] = set()
+        self._by_class: Dict[str, Set[LiveClient]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        scheduler.add_listener(self.on_period)
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    @property
+    def connections(self) -> int:
+        return len(self._clients)
+
+    # === Fan-out ===
+    def _publish(self, frame: str, clients: Iterable[LiveClient]) -> int:
+        sent = 0
+        for client in clients:
+            push_latest(client.queue, frame)
+            sent += 1
+        return sent
+
+    def on_period(self, class_name: str, payload: Dict[str, Any]) -> None:
+        clients = self._by_class.get(class_name)
+        if clients:
+            self._publish(encode_frame("period", data=payload), clients)
+
+    def on_reload(self, index: TimetableIndex) -> None:
+        # Runs on the reloader thread; hop onto the event loop before touching queues.
+        if self._loop is not None:
+            frame = encode_frame("timetable_reload", version=index.version, classes=len(index.classes))
+            self._loop.call_soon_threadsafe(self._publish, frame, list(self._clients))
+
+    def announce(self, message: str, classes: Optional[List[str]] = None) -> int:
+        frame = encode_frame("announcement", message=message, classes=classes)
+        if classes is None:
+            return self._publish(frame, self._clients)
+        targets: Set[LiveClient] = set()
+        for class_name in classes:
+            targets |= self._by_class.get(class_name, set())
+        return self._publish(frame, targets)
+
+    # === Subscriptions ===
+    def subscribe(self, client: LiveClient, classes: Iterable[str]) -> List[str]:
+        added = [c for c in classes if c not in client.classes]
+        for class_name in added:
+            client.classes.add(class_name)
+            self._by_class.setdefault(class_name, set()).add(client)
+            self.scheduler.watch(class_name)
+        return added
+
+    def unsubscribe(self, client: LiveClient, classes: Iterable[str]) -> List[str]:
+        removed = [c for c in classes if c in client.classes]
+        for class_name in removed:
+            client.classes.discard(class_name)
+            clients = self._by_class.get(class_name)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del self._by_class[class_name]
+            self.scheduler.unwatch(class_name)
+        return removed
+
+    @staticmethod
+    def _resolve(store: TimetableStore, names: Iterable[str]) -> List[str]:
+        resolved = []
+        for name in names:
+            if name.strip().lower() == "all":
+                return list(store.classes)
+            found = store.resolve_class(name)
+            if found is None:
+                raise ValueError(f"Class not found in timetable: {name}")
+            resolved.append(found)
+        return resolved
+
+    async def _handle_message(self, client: LiveClient, raw: str) -> None:
+        try:
+            message = json.loads(raw)
+            if not isinstance(message, dict):
+                raise ValueError("message must be a JSON object")
+            action = message.get("action")
+            names = message.get("classes", [])
+            if isinstance(names, str):
+                names = names.split(",")
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                raise ValueError("classes must be a list of class names")
+            store = self.get_store()
+            if self.offload:
+                classes = await self.offload(self._resolve, store, names)
+            else:
+                classes = self._resolve(store, names)
+        except (ValueError, AttributeError, DatabaseBusyError) as e:
+            push_latest(client.queue, encode_frame("error", detail=str(e)))
+            return
+        if action == "subscribe":
+            added = self.subscribe(client, classes)
+            push_latest(client.queue, encode_frame("subscribed", classes=sorted(client.classes)))
+            for payload in await self.scheduler.current(added):
+                push_latest(client.queue, encode_frame("period", data=payload))
+        elif action == "unsubscribe":
+            self.unsubscribe(client, classes)
+            push_latest(client.queue, encode_frame("subscribed", classes=sorted(client.classes)))
+        else:
+            push_latest(client.queue, encode_frame("error", detail="action must be 'subscribe' or 'unsubscribe'"))
+
+    # === Connection ===
+    async def serve(self, websocket: WebSocket, classes: Iterable[str] = ()) -> None:
+        await websocket.accept()
+        client = LiveClient(websocket)
+        self._clients.add(client)
+        sender = asyncio.create_task(self._send_loop(client))
+        try:
+            if classes:
+                await self._handle_message(client, json.dumps({"action": "subscribe", "classes": list(classes)}))
+            while True:
+                await self._handle_message(client, await websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sender.cancel()
+            self.unsubscribe(client, list(client.classes))
+            self._clients.discard(client)
+
+    async def _send_loop(self, client: LiveClient) -> None:
+        try:
+            while True:
+                await client.websocket.send_text(await client.queue.get())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"Live client send failed, closing: {e}")
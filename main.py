@@ -1,22 +1,50 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Header, Query, HTTPException, Request, WebSocket
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from datetime import datetime, time
-from typing import Optional, List, Dict, Any
-import json
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable, Hashable, Iterator, Tuple, Type, Union
+from datetime import date, datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+import hmac
 import os
-import pytz  # 🔁 Added for timezone support
+import time
+
+from timetable_index import (
+    CALENDAR_CACHE_SIZE, DAYS, Booking, EffectiveDay, NowAnswer, Period, TimetableIndex, normalize_day, format_minutes, parse_minutes, MINUTES_PER_DAY
+)
+from free_slots import break_windows, free_windows
+from timetable_reload import TimetableReloader
+from timetable_store import TimetableStore, get_store, open_store, read_store, use_store
+from clock import ClockSnapshot, clock_for
+from period_events import PeriodScheduler
+from live_hub import LiveHub
+from db_pool import close_pools
+from db_executor import DatabaseBusyError, db_executor
+from response_cache import ResponseCache, encode_json, etag_matches, make_etag
+from ics_export import FOOTER as ICS_FOOTER, calendar_header, class_events, utc_stamp
 
 # === Import AI Routes ===
 from ai import router as ai_router
 
-# === Timezone ===
-INDIA_TZ = pytz.timezone("Asia/Kolkata")
+# === Lifespan ===
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timetable_reloader.start()
+    db_executor.start()
+    period_scheduler.start()
+    live_hub.start()
+    yield
+    await period_scheduler.stop()
+    timetable_reloader.stop()
+    db_executor.stop()
+    close_pools()
 
 app = FastAPI(
     title="📚 Smart School AI Assistant",
     description="A powerful backend for managing class schedules and AI-powered assistance.",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # === CORS Settings ===
@@ -31,19 +59,72 @@ app.add_middleware(
 # === Mount AI Router ===
 app.include_router(ai_router)
 
+@app.exception_handler(DatabaseBusyError)
+async def database_busy(request: Request, exc: DatabaseBusyError):
+    # Shed load while the DB queue is full instead of queueing without bound.
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 # === Load Timetable JSON ===
 TIMETABLE_FILE = "timetable.json"
 if not os.path.exists(TIMETABLE_FILE):
     raise FileNotFoundError("❌ timetable.json not found!")
 
-with open(TIMETABLE_FILE, "r") as f:
-    timetable: Dict[str, Any] = json.load(f)
+# Polled for changes in the background; every request reads `.index` once.
+# Workers start from the binary snapshot when it is newer than the JSON; set
+# TIMETABLE_SNAPSHOT="" to always parse the JSON.
+timetable_reloader = TimetableReloader(
+    TIMETABLE_FILE,
+    interval=float(os.getenv("TIMETABLE_RELOAD_INTERVAL", "2")),
+    snapshot_path=os.getenv("TIMETABLE_SNAPSHOT", "timetable.snap"),
+)
+
+def get_timetable() -> TimetableIndex:
+    return timetable_reloader.index
+
+# === Read Store ===
+# TIMETABLE_STORE picks what the schedule routes and the AI shortcut read: "index" (default)
+# serves the compiled timetable.json, "sqlite" serves timetable.db (load it with database.py).
+# Calendar dates, teachers, rooms, free slots and the .ics feed always use the compiled index.
+use_store(open_store(os.getenv("TIMETABLE_STORE", "index"), get_timetable))
+Timetable = Union[TimetableIndex, TimetableStore]
+
+# === Pre-encoded Responses ===
+response_cache = ResponseCache()
+# Store routes cache separately: a SQLite store is versioned apart from the JSON index.
+store_cache = ResponseCache()
+# Any client can ask for any date, so per-date bodies live in a bounded LRU.
+date_cache = ResponseCache(maxsize=CALENDAR_CACHE_SIZE)
+HOLIDAY_SCHEDULE = [{"subject": "Holiday", "start_time": "-", "end_time": "-"}]
+# Static routes may be stored but must be revalidated with If-None-Match.
+STATIC_CACHE_CONTROL = "public, no-cache"
 
 # === Pydantic Models ===
 class PeriodInfo(BaseModel):
     subject: str
     start_time: str
     end_time: str
+    teacher: Optional[str] = None
+    room: Optional[str] = None
+
+class BookingInfo(PeriodInfo):
+    class_name: str
+
+class TeacherNowResponse(BaseModel):
+    teacher: str
+    day: str
+    time: str
+    current: Optional[BookingInfo] = None
+    next: Optional[BookingInfo] = None
+    message: str
+
+class RoomNowResponse(BaseModel):
+    room: str
+    day: str
+    time: str
+    is_free: bool
+    current: Optional[BookingInfo] = None
+    next: Optional[BookingInfo] = None
+    message: str
 
 class TimetableResponse(BaseModel):
     class_name: str
@@ -58,53 +139,180 @@ class CurrentPeriodResponse(BaseModel):
     next_subject: Optional[str] = None
     message: Optional[str] = None
 
+class DateScheduleResponse(TimetableResponse):
+    date: str
+    holiday: Optional[str] = None
+    note: Optional[str] = None
+
+class BulkCurrentPeriodResponse(BaseModel):
+    day: str
+    time: str
+    periods: List[CurrentPeriodResponse]
+
+class AnnouncementRequest(BaseModel):
+    message: str
+    classes: Optional[List[str]] = None
+
 class ClassList(BaseModel):
     classes: List[str]
 
+class ResourceList(BaseModel):
+    names: List[str]
+
 class FullWeekSchedule(BaseModel):
     class_name: str
     week_schedule: Dict[str, List[PeriodInfo]]
 
-# === Utilities ===
-def get_india_datetime() -> datetime:
-    return datetime.now(INDIA_TZ)
+class TimeWindow(BaseModel):
+    start: str
+    end: str
+    minutes: int
 
-def get_today() -> str:
-    return get_india_datetime().strftime("%A")
+class DayWindows(BaseModel):
+    day: str
+    date: Optional[str] = None
+    windows: List[TimeWindow]
 
-def get_current_time() -> time:
-    return get_india_datetime().time()
+class FreeSlotsResponse(BaseModel):
+    mode: str
+    classes: List[str]
+    days: List[DayWindows]
 
-def get_current_time_str() -> str:
-    return get_india_datetime().strftime("%H:%M")
+# === Utilities ===
+def max_age(seconds: float) -> str:
+    return f"public, max-age={max(int(seconds), 0)}"
 
-def parse_time(time_str: str) -> time:
-    return datetime.strptime(time_str, "%H:%M").time()
+def cache_until(minute: int, now: ClockSnapshot) -> str:
+    # Cache-Control for a time-dependent answer that stays valid until `minute` today.
+    return max_age(now.seconds_until(minute))
 
-def get_class_schedule(class_name: str, day: str) -> List[Dict[str, str]]:
-    if timetable.get("class", "").lower() != class_name.lower():
+def resolve_class(timetable: Timetable, class_name: str) -> str:
+    resolved = timetable.resolve_class(class_name)
+    if resolved is None:
         raise HTTPException(status_code=404, detail="Class not found in timetable.")
-    schedule = timetable["daily_schedule"].get(day)
-    if not schedule:
+    return resolved
+
+def resolve_classes(timetable: Timetable, classes: List[str]) -> List[str]:
+    # Accepts repeated and comma-separated names; "all" (or nothing) means every class.
+    requested = [name.strip() for item in classes for name in item.split(",") if name.strip()]
+    if not requested or any(name.lower() == "all" for name in requested):
+        return list(timetable.classes)
+    resolved = [timetable.resolve_class(name) for name in requested]
+    unknown = [name for name, found in zip(requested, resolved) if found is None]
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Classes not found in timetable: {', '.join(unknown)}")
+    return list(dict.fromkeys(resolved))
+
+def get_class_today(store: TimetableStore, class_name: str, now: ClockSnapshot) -> EffectiveDay:
+    # Today's schedule after holidays, weekly offs and substitutions; 404 only on an unscheduled working day.
+    effective = store.today(class_name, now)
+    if effective.holiday is None and not effective.schedule.periods:
+        raise HTTPException(status_code=404, detail=f"No schedule found for {now.day}.")
+    return effective
+
+def holiday_message(holiday: str) -> str:
+    return f"📅 It's {holiday}! Enjoy your holiday 😊"
+
+def get_class_schedule(store: TimetableStore, class_name: str, day: str) -> List[Period]:
+    periods = store.day(resolve_class(store, class_name), day)
+    if not periods:
         raise HTTPException(status_code=404, detail=f"No schedule found for {day}.")
-    return schedule
-
-def get_current_subject(schedule: List[Dict[str, str]]) -> Optional[str]:
-    now = get_current_time()
-    for period in schedule:
-        start = parse_time(period["start_time"])
-        end = parse_time(period["end_time"])
-        if start <= now < end:
-            return period["subject"]
-    return None
-
-def get_next_subject(schedule: List[Dict[str, str]]) -> Optional[str]:
-    now = get_current_time()
-    for period in schedule:
-        start = parse_time(period["start_time"])
-        if now < start:
-            return period["subject"]
-    return None
+    return periods
+
+def class_now(timetable: Timetable, class_name: str, timestamp: Optional[float] = None) -> ClockSnapshot:
+    # Each class reads the clock of its own school timezone (timetable "timezone").
+    clock = clock_for(timetable.timezone_for(class_name))
+    return clock.now() if timestamp is None else clock.at(timestamp)
+
+def current_period_payload(class_name: str, now: ClockSnapshot,
+                           effective: EffectiveDay) -> Tuple[Dict[str, Any], int]:
+    # Shared by the single, bulk and live routes; returns the payload and the minute it expires.
+    if effective.holiday is not None:
+        return {
+            "class_name": class_name,
+            "day": now.day,
+            "time": now.time_str,
+            "current_subject": None,
+            "next_subject": None,
+            "message": holiday_message(effective.holiday)
+        }, MINUTES_PER_DAY
+    answer = effective.schedule.now(now.minute)
+    return {
+        "class_name": class_name,
+        "day": now.day,
+        "time": now.time_str,
+        "current_subject": answer.current.subject if answer.current else None,
+        "next_subject": answer.upcoming.subject if answer.upcoming else None,
+        "message": answer.message
+    }, answer.until
+
+def describe_current(store: TimetableStore, class_name: str, timestamp: float) -> Tuple[Dict[str, Any], float]:
+    now = class_now(store, class_name, timestamp)
+    payload, until = current_period_payload(class_name, now, store.today(class_name, now))
+    return payload, now.seconds_until(until)
+
+def describe_period(index: TimetableIndex, class_name: str, timestamp: float) -> Tuple[Dict[str, Any], float]:
+    # The scheduler watches reloads through the index; the answer itself comes from the store.
+    return describe_current(get_store(), class_name, timestamp)
+
+def booking_info(booking: Optional[Booking]) -> Optional[Dict[str, Any]]:
+    # Every BookingInfo field, in model order, so the bypassed response matches the schema.
+    if booking is None:
+        return None
+    return {
+        "subject": booking.subject,
+        "start_time": booking.start_time,
+        "end_time": booking.end_time,
+        "teacher": booking.teacher,
+        "room": booking.room,
+        "class_name": booking.class_name,
+    }
+
+def resource_now(dimension: str, name: str) -> Tuple[str, ClockSnapshot, NowAnswer]:
+    # Teachers and rooms span classes, so they run on the school's own timezone.
+    timetable = get_timetable()
+    resolved = timetable.resources[dimension].resolve(name)
+    if resolved is None:
+        raise HTTPException(status_code=404, detail=f"{dimension.capitalize()} not found in timetable.")
+    now = clock_for(timetable.timezone).now()
+    return resolved, now, timetable.resource_day(dimension, resolved, now.date, now.day).now(now.minute)
+
+def json_response(payload: Any, cache_control: Optional[str] = None) -> Response:
+    # Hot routes return pre-encoded bytes, so FastAPI skips response_model validation and
+    # jsonable_encoder. The payloads are built field-for-field in model order from data
+    # validated at load; response_model stays on the decorators for the OpenAPI schema.
+    headers = {"Cache-Control": cache_control} if cache_control else None
+    return Response(content=encode_json(payload), media_type="application/json", headers=headers)
+
+def cached_response(request: Request, timetable: Timetable, key: Hashable, build: Callable[[], Dict[str, Any]],
+                    model: Optional[Type[BaseModel]] = None,
+                    cache_control: str = STATIC_CACHE_CONTROL,
+                    cache: Optional[ResponseCache] = None) -> Response:
+    # Validated and encoded once per timetable version, then served as raw bytes.
+    def render() -> Any:
+        payload = build()
+        return jsonable_encoder(model(**payload), exclude_unset=True) if model else payload
+
+    if cache is None:
+        cache = store_cache if isinstance(timetable, TimetableStore) else response_cache
+    entry = cache.get(timetable.version, key, render)
+    headers = {"ETag": entry.etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+# === Live Period Events ===
+# One scheduler per worker sleeps until the next bell of any subscribed class.
+# Its per-bell batches run on the DB executor when the store is SQLite.
+period_scheduler = PeriodScheduler(get_timetable, describe_period, offload=read_store)
+timetable_reloader.subscribe(period_scheduler.notify)
+
+# Kiosks multiplex many classes over one WebSocket; built on the same scheduler and store.
+live_hub = LiveHub(get_store, period_scheduler, offload=read_store)
+timetable_reloader.subscribe(live_hub.on_reload)
+
+# Pushing to every kiosk needs this shared secret in X-Announce-Token; unset means disabled.
+ANNOUNCE_TOKEN = os.getenv("ANNOUNCE_TOKEN", "")
 
 # === API Endpoints ===
 
@@ -112,137 +320,394 @@ def get_next_subject(schedule: List[Dict[str, str]]) -> Optional[str]:
 def status():
     return {"status": "✅ Smart School Backend is Running!"}
 
+@app.get("/db_status", tags=["Utility"])
+def db_status():
+    # Queue depth and latency of the executor that async routes use for SQLite reads.
+    return {"store": get_store().backend, "executor": db_executor.stats()}
+
 @app.get("/get_current_period", response_model=CurrentPeriodResponse, tags=["Timetable"])
 def get_current_period(class_name: str = Query(..., alias="class")):
-    today = get_today()
-    now_str = get_current_time_str()
-
-    if today == "Sunday":
-        return {
-            "class_name": class_name,
-            "day": today,
-            "time": now_str,
-            "message": "📅 It's Sunday! Enjoy your holiday 😊"
-        }
-
-    schedule = get_class_schedule(class_name, today)
-    current_subject = get_current_subject(schedule)
-    next_subject = get_next_subject(schedule)
-
-    if current_subject:
-        message = f"🟢 Current class: {current_subject}"
-    elif next_subject:
-        message = f"⏭️ No class now. Next: {next_subject}"
-    else:
-        message = "🏁 School might be over for the day."
-
-    return {
-        "class_name": class_name,
-        "day": today,
-        "time": now_str,
-        "current_subject": current_subject,
-        "next_subject": next_subject,
-        "message": message
-    }
+    store = get_store()
+    class_name = resolve_class(store, class_name)
+    now = class_now(store, class_name)
+    payload, until = current_period_payload(class_name, now, get_class_today(store, class_name, now))
+    return json_response(payload, cache_until(until, now))
+
+@app.get("/get_current_periods", response_model=BulkCurrentPeriodResponse, tags=["Timetable"])
+def get_current_periods(
+    classes: List[str] = Query(["all"], alias="class",
+                               description="Repeat or comma-separate class names; 'all' for every class"),
+    format: str = Query("json", description="'json' or 'ndjson' (one class per line, streamed)"),
+):
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'.")
+    store = get_store()
+    resolved = resolve_classes(store, classes)
+
+    # One clock read for every class, so all rows agree on the instant.
+    timestamp = time.time()
+    now = clock_for(store.timezone).at(timestamp)
+    rows = []
+    expires = now.seconds_until(MINUTES_PER_DAY)
+    for class_name in resolved:
+        payload, until = describe_current(store, class_name, timestamp)
+        rows.append(payload)
+        expires = min(expires, until)
+    headers = {"Cache-Control": max_age(expires)}
+
+    if format == "ndjson":
+        def stream() -> Iterator[bytes]:
+            for row in rows:
+                yield encode_json(row) + b"\n"
+        return StreamingResponse(stream(), media_type="application/x-ndjson", headers=headers)
+
+    return Response(
+        content=encode_json({"day": now.day, "time": now.time_str, "periods": rows}),
+        media_type="application/json",
+        headers=headers,
+    )
+
+@app.get("/stream_periods", tags=["Live"])
+async def stream_periods(
+    classes: List[str] = Query(["all"], alias="class",
+                               description="Repeat or comma-separate class names; 'all' for every class"),
+):
+    resolved = await read_store(resolve_classes, get_store(), classes)
+
+    async def events() -> AsyncIterator[bytes]:
+        # The current state first, then one event per class at each of its bells.
+        queue = period_scheduler.subscribe(resolved)
+        try:
+            for chunk in await period_scheduler.snapshot(resolved):
+                yield chunk
+            while True:
+                yield await queue.get()
+        finally:
+            period_scheduler.unsubscribe(queue, resolved)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/ws/live")
+async def live_updates(websocket: WebSocket, classes: List[str] = Query([], alias="class")):
+    # Clients send {"action": "subscribe" | "unsubscribe", "classes": [...]} at any time.
+    names = [name.strip() for item in classes for name in item.split(",") if name.strip()]
+    await live_hub.serve(websocket, names)
+
+@app.post("/announcements", tags=["Live"])
+async def post_announcement(request: AnnouncementRequest,
+                            token: Optional[str] = Header(None, alias="X-Announce-Token")):
+    if not ANNOUNCE_TOKEN:
+        raise HTTPException(status_code=403, detail="Announcements are disabled; set ANNOUNCE_TOKEN to enable them.")
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), ANNOUNCE_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid announcement token.")
+    classes = None
+    if request.classes:
+        # Same store the kiosks subscribed through, so DB-only classes resolve too.
+        classes = await read_store(resolve_classes, get_store(), request.classes)
+    return {"delivered": live_hub.announce(request.message, classes)}
 
 @app.get("/get_day_schedule", response_model=TimetableResponse, tags=["Timetable"])
-def get_today_schedule(class_name: str = Query(..., alias="class")):
-    today = get_today()
-    if today == "Sunday":
-        return {
-            "class_name": class_name,
-            "day": today,
-            "timetable": [{"subject": "Holiday", "start_time": "-", "end_time": "-"}]
-        }
-    schedule = get_class_schedule(class_name, today)
-    return {
-        "class_name": class_name,
-        "day": today,
-        "timetable": schedule
-    }
+def get_today_schedule(request: Request, class_name: str = Query(..., alias="class")):
+    store = get_store()
+    class_name = resolve_class(store, class_name)
+    now = class_now(store, class_name)
+    effective = store.today(class_name, now)
+    # Everything below reads this one store, so a reload mid-request cannot mix two versions.
+    # Revalidated like the static routes: the ETag changes with the day and with every reload.
+    if effective.note is None:
+        # A plain weekly day shares its cache entry with /get_day_schedule/{day}.
+        return day_schedule_response(request, store, class_name, now.day, STATIC_CACHE_CONTROL)
+    return date_schedule_response(request, store, class_name, date.fromisoformat(now.date),
+                                  TimetableResponse, STATIC_CACHE_CONTROL, effective)
+
+@app.get("/get_date_schedule/{on}", response_model=DateScheduleResponse, tags=["Timetable"])
+def get_schedule_by_date(request: Request, on: date, class_name: str = Query(..., alias="class")):
+    timetable = get_timetable()
+    class_name = resolve_class(timetable, class_name)
+    return date_schedule_response(request, timetable, class_name, on, DateScheduleResponse, STATIC_CACHE_CONTROL)
+
+def date_schedule_response(request: Request, timetable: Timetable, class_name: str, on: date,
+                           model: Type[BaseModel], cache_control: str,
+                           effective: Optional[EffectiveDay] = None) -> Response:
+    day = DAYS[on.weekday()]
+    if effective is None:
+        effective = timetable.effective_day(class_name, on.isoformat(), day)
+    if effective.holiday is None and not effective.schedule.periods:
+        raise HTTPException(status_code=404, detail=f"No schedule found for {on.isoformat()}.")
+
+    def build() -> Dict[str, Any]:
+        schedule = HOLIDAY_SCHEDULE if effective.holiday else [p.as_dict() for p in effective.schedule.periods]
+        return {"class_name": class_name, "day": day, "date": on.isoformat(), "timetable": schedule,
+                "holiday": effective.holiday, "note": effective.note}
+
+    return cached_response(request, timetable, ("date_schedule", class_name, on, model), build, model, cache_control,
+                           date_cache)
 
 @app.get("/get_day_schedule/{day}", response_model=TimetableResponse, tags=["Timetable"])
-def get_schedule_by_day(day: str, class_name: str = Query(..., alias="class")):
-    if day.capitalize() == "Sunday":
-        return {
-            "class_name": class_name,
-            "day": "Sunday",
-            "timetable": [{"subject": "Holiday", "start_time": "-", "end_time": "-"}]
-        }
-    schedule = get_class_schedule(class_name, day.capitalize())
-    return {
-        "class_name": class_name,
-        "day": day.capitalize(),
-        "timetable": schedule
+def get_schedule_by_day(request: Request, day: str, class_name: str = Query(..., alias="class")):
+    return day_schedule_response(request, get_store(), class_name, day, STATIC_CACHE_CONTROL)
+
+def day_schedule_response(request: Request, store: TimetableStore, class_name: str, day: str,
+                          cache_control: str) -> Response:
+    class_name = resolve_class(store, class_name)
+    day = normalize_day(day)
+    # Only the 404 check runs per request; the dicts are built once per cached body.
+    periods = None if store.is_weekly_off(class_name, day) else get_class_schedule(store, class_name, day)
+    return cached_response(
+        request,
+        store,
+        ("day_schedule", class_name, day),
+        lambda: {"class_name": class_name, "day": day,
+                 "timetable": HOLIDAY_SCHEDULE if periods is None else [p.as_dict() for p in periods]},
+        TimetableResponse,
+        cache_control,
+    )
+
+@app.get("/export_ics", tags=["Timetable"], response_class=StreamingResponse)
+def export_ics(
+    request: Request,
+    classes: List[str] = Query(..., alias="class",
+                               description="Repeat or comma-separate class names; 'all' for every class"),
+):
+    # RFC 5545 feed for calendar subscriptions: weekly RRULEs plus calendar overrides.
+    timetable = get_timetable()
+    resolved = resolve_classes(timetable, classes)
+
+    def build(class_name: str) -> bytes:
+        today = date.fromisoformat(class_now(timetable, class_name).date)
+        monday = today - timedelta(days=today.weekday())
+        return class_events(timetable, class_name, monday, utc_stamp(datetime.now(timezone.utc)))
+
+    # Each class's VEVENT block is built once per timetable version and streamed as-is.
+    entries = [
+        response_cache.get(timetable.version, ("ics", class_name), lambda c=class_name: build(c), bytes)
+        for class_name in resolved
+    ]
+    year = int(class_now(timetable, resolved[0]).date[:4])
+    etag = make_etag(f"{year}|{'|'.join(resolved)}|{''.join(e.etag for e in entries)}".encode("utf-8"))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": STATIC_CACHE_CONTROL,
+        "Content-Disposition": 'inline; filename="timetable.ics"',
     }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    def stream() -> Iterator[bytes]:
+        zones = [timetable.timezone_for(c) for c in resolved]
+        yield calendar_header(f"Timetable {', '.join(resolved)}", zones, year)
+        for entry in entries:
+            yield entry.body
+        yield ICS_FOOTER
+
+    return StreamingResponse(stream(), media_type="text/calendar; charset=utf-8", headers=headers)
 
 @app.get("/get_full_week", response_model=FullWeekSchedule, tags=["Timetable"])
-def get_full_week(class_name: str = Query(..., alias="class")):
-    if timetable.get("class", "").lower() != class_name.lower():
+def get_full_week(request: Request, class_name: str = Query(..., alias="class")):
+    store = get_store()
+    resolved = store.resolve_class(class_name)
+    if resolved is None:
         raise HTTPException(status_code=404, detail="Class not found.")
-    full_week = timetable["daily_schedule"].copy()
-    full_week["Sunday"] = [{"subject": "Holiday", "start_time": "-", "end_time": "-"}]
-    return {
-        "class_name": class_name,
-        "week_schedule": full_week
-    }
+
+    def build() -> Dict[str, Any]:
+        full_week = {day: [p.as_dict() for p in periods] for day, periods in store.week(resolved).items()}
+        for day in DAYS:
+            if store.is_weekly_off(resolved, day):
+                full_week[day] = HOLIDAY_SCHEDULE
+        return {"class_name": resolved, "week_schedule": full_week}
+
+    return cached_response(request, store, ("full_week", resolved, None), build, FullWeekSchedule)
 
 @app.get("/get_all_classes", response_model=ClassList, tags=["Timetable"])
-def get_all_classes():
-    return {"classes": [timetable.get("class", "Unknown")]}
+def get_all_classes(request: Request):
+    store = get_store()
+    return cached_response(
+        request, store, ("all_classes", None, None), lambda: {"classes": store.classes}, ClassList
+    )
 
 @app.get("/get_subjects", tags=["Timetable"])
-def get_subjects():
-    subjects = set()
-    for day, periods in timetable.get("daily_schedule", {}).items():
-        for period in periods:
-            subjects.add(period["subject"])
-    return {"subjects": sorted(subjects)}
+def get_subjects(request: Request):
+    store = get_store()
+    return cached_response(
+        request, store, ("subjects", None, None), lambda: {"subjects": store.subjects}
+    )
+
+@app.get("/get_teachers", response_model=ResourceList, tags=["Staff"])
+def get_teachers(request: Request):
+    timetable = get_timetable()
+    return cached_response(request, timetable, ("teachers", None, None),
+                           lambda: {"names": timetable.resources["teacher"].names}, ResourceList)
+
+@app.get("/get_rooms", response_model=ResourceList, tags=["Staff"])
+def get_rooms(request: Request):
+    timetable = get_timetable()
+    return cached_response(request, timetable, ("rooms", None, None),
+                           lambda: {"names": timetable.resources["room"].names}, ResourceList)
+
+@app.get("/get_teacher_now", response_model=TeacherNowResponse, tags=["Staff"])
+def get_teacher_now(teacher: str = Query(...)):
+    name, now, answer = resource_now("teacher", teacher)
+    current, upcoming = answer.current, answer.upcoming
+    if current:
+        where = f" in {current.room}" if current.room else ""
+        message = f"🟢 {name} is teaching {current.subject} to {current.class_name}{where}"
+    elif upcoming:
+        message = f"⏭️ {name} is free. Next: {upcoming.subject} with {upcoming.class_name} at {upcoming.start_time}"
+    else:
+        message = f"🏁 No more classes today for {name}."
+    return json_response({
+        "teacher": name,
+        "day": now.day,
+        "time": now.time_str,
+        "current": booking_info(current),
+        "next": booking_info(upcoming),
+        "message": message,
+    }, cache_until(answer.until, now))
+
+@app.get("/get_room_now", response_model=RoomNowResponse, tags=["Staff"])
+def get_room_now(room: str = Query(...)):
+    name, now, answer = resource_now("room", room)
+    current, upcoming = answer.current, answer.upcoming
+    if current:
+        message = f"🔴 In use by {current.class_name} for {current.subject} until {current.end_time}"
+    elif upcoming:
+        message = f"🟢 Free until {upcoming.start_time}"
+    else:
+        message = "🟢 Free for the rest of the day."
+    return json_response({
+        "room": name,
+        "day": now.day,
+        "time": now.time_str,
+        "is_free": current is None,
+        "current": booking_info(current),
+        "next": booking_info(upcoming),
+        "message": message,
+    }, cache_until(answer.until, now))
 
 @app.get("/search_periods_by_subject", tags=["Search"])
-def search_by_subject(subject: str = Query(...)):
-    results = []
-    for day, periods in timetable.get("daily_schedule", {}).items():
-        for period in periods:
-            if subject.lower() in period["subject"].lower():
-                results.append({
-                    "day": day,
-                    "subject": period["subject"],
-                    "start_time": period["start_time"],
-                    "end_time": period["end_time"]
-                })
-    if not results:
+def search_by_subject(
+    subject: str = Query(...),
+    match: str = Query("substring", description="'substring' or 'prefix' (matches word starts)"),
+    class_name: Optional[str] = Query(None, alias="class"),
+    day: Optional[str] = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+):
+    if match not in ("substring", "prefix"):
+        raise HTTPException(status_code=400, detail="match must be 'substring' or 'prefix'.")
+    store = get_store()
+    if class_name is not None:
+        class_name = resolve_class(store, class_name)
+    matches = store.search(
+        subject, match, class_name, normalize_day(day) if day else None
+    )
+    if not matches:
         raise HTTPException(status_code=404, detail="No periods found for this subject.")
-    return {"subject": subject, "results": results}
+    page = matches[offset:offset + limit] if limit else matches[offset:]
+    results = [
+        {
+            "class_name": found_class,
+            "day": found_day,
+            "subject": period.subject,
+            "start_time": period.start_time,
+            "end_time": period.end_time
+        }
+        for found_class, found_day, period in page
+    ]
+    return json_response({"subject": subject, "total": len(matches), "offset": offset, "limit": limit, "results": results})
+
+@app.get("/find_free_slots", response_model=FreeSlotsResponse, tags=["Timetable"])
+def find_free_slots(
+    classes: List[str] = Query(["all"], alias="class",
+                               description="Repeat or comma-separate class names; 'all' for every class"),
+    day: str = Query("week", description="Weekday name, or 'week' for every day"),
+    on: Optional[date] = Query(None, alias="date", description="Calendar date (YYYY-MM-DD); overrides day"),
+    mode: str = Query("free", description="'free' (no class is being taught) or 'break' (every class is on a break)"),
+    start: Optional[str] = Query(None, description="HH:MM; defaults to the earliest first period"),
+    end: Optional[str] = Query(None, description="HH:MM; defaults to the latest last period"),
+    min_minutes: int = Query(1, ge=1),
+):
+    if mode not in ("free", "break"):
+        raise HTTPException(status_code=400, detail="mode must be 'free' or 'break'.")
+    try:
+        lo = parse_minutes(start) if start else None
+        hi = parse_minutes(end) if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be HH:MM.")
+    timetable = get_timetable()
+    resolved = resolve_classes(timetable, classes)
+    find = free_windows if mode == "free" else break_windows
+
+    if on is not None:
+        dates = [(DAYS[on.weekday()], on.isoformat())]
+    elif day.strip().lower() == "week":
+        dates = [(d, None) for d in DAYS]
+    else:
+        dates = [(normalize_day(day), None)]
+        if dates[0][0] not in DAYS:
+            raise HTTPException(status_code=400, detail=f"Unknown day: {day}")
+
+    days = []
+    for day_name, on_date in dates:
+        schedules = [
+            (timetable.effective_day(c, on_date, day_name) if on_date else timetable.weekly_day(c, day_name)).schedule
+            for c in resolved
+        ]
+        scheduled = [s for s in schedules if s.periods]
+        if not scheduled:
+            continue
+        windows = find(
+            schedules,
+            lo if lo is not None else min(s.start for s in scheduled),
+            hi if hi is not None else max(s.end for s in scheduled),
+            min_minutes,
+        )
+        days.append({
+            "day": day_name,
+            "date": on_date,
+            "windows": [
+                {"start": format_minutes(a), "end": format_minutes(b), "minutes": b - a} for a, b in windows
+            ],
+        })
+    return json_response({"mode": mode, "classes": resolved, "days": days})
 
 @app.get("/is_class_over_today", tags=["Timetable"])
 def is_class_over_today(class_name: str = Query(..., alias="class")):
-    today = get_today()
-    now = get_current_time()
-    if today == "Sunday":
-        return {"class_name": class_name, "status": "Holiday"}
-    schedule = get_class_schedule(class_name, today)
-    last_end = parse_time(schedule[-1]["end_time"])
-    return {
+    store = get_store()
+    class_name = resolve_class(store, class_name)
+    now = class_now(store, class_name)
+    effective = get_class_today(store, class_name, now)
+    if effective.holiday is not None:
+        return json_response({"class_name": class_name, "status": "Holiday"}, cache_until(MINUTES_PER_DAY, now))
+    last_end = effective.schedule.end
+    is_over = now.minute >= last_end
+    return json_response({
         "class_name": class_name,
-        "current_time": now.strftime("%H:%M"),
-        "last_class_end_time": last_end.strftime("%H:%M"),
-        "is_over": now > last_end
-    }
+        "current_time": now.time_str,
+        "last_class_end_time": format_minutes(last_end),
+        "is_over": is_over
+    }, cache_until(MINUTES_PER_DAY if is_over else last_end, now))
 
 @app.get("/get_next_class_time", tags=["Timetable"])
 def get_next_class_time(class_name: str = Query(..., alias="class")):
-    today = get_today()
-    now = get_current_time()
-    if today == "Sunday":
-        return {"class_name": class_name, "next_class": None, "message": "📅 It's Sunday!"}
-    schedule = get_class_schedule(class_name, today)
-    for period in schedule:
-        start = parse_time(period["start_time"])
-        if now < start:
-            return {
-                "class_name": class_name,
-                "next_subject": period["subject"],
-                "start_time": start.strftime("%H:%M")
-            }
-    return {"class_name": class_name, "message": "✅ All classes for today are done."}
+    store = get_store()
+    class_name = resolve_class(store, class_name)
+    now = class_now(store, class_name)
+    effective = get_class_today(store, class_name, now)
+    if effective.holiday is not None:
+        return json_response({"class_name": class_name, "next_class": None, "message": f"📅 It's {effective.holiday}!"},
+                             cache_until(MINUTES_PER_DAY, now))
+    answer = effective.schedule.now(now.minute)
+    cache_control = cache_until(answer.until, now)
+    upcoming = answer.upcoming
+    if upcoming:
+        return json_response({
+            "class_name": class_name,
+            "next_subject": upcoming.subject,
+            "start_time": upcoming.start_time
+        }, cache_control)
+    return json_response({"class_name": class_name, "message": "✅ All classes for today are done."}, cache_control)
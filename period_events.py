@@ -0,0 +1,226 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import logging
+import time
+
+from response_cache import encode_json
+from timetable_index import TimetableIndex
+
+logger = logging.getLogger(__name__)
+
+# (index, class, POSIX timestamp) -> (payload, seconds until the payload expires)
+Describe = Callable[[TimetableIndex, str, float], Tuple[Dict[str, Any], float]]
+# Called with (class, payload) on every transition of a watched class.
+TransitionListener = Callable[[str, Dict[str, Any]], None]
+# Awaits fn(*args) somewhere else, e.g. on the DB executor when answers come from SQLite.
+Offload = Callable[..., Awaitable[Any]]
+
+HEARTBEAT_SECONDS = 30.0
+QUEUE_SIZE = 16
+HEARTBEAT = b": keepalive\n\n"
+
+def sse_event(event: str, payload: Dict[str, Any]) -> bytes:
+    return b"event: " + event.encode("ascii") + b"\ndata: " + encode_json(payload) + b"\n\n"
+
+def push_latest(queue: "asyncio.Queue[bytes]", chunk: bytes) -> None:
+    # A slow client only ever loses its oldest pending events, never blocks the scheduler.
+    if queue.full():
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    queue.put_nowait(chunk)
+
+# === Scheduler ===
+class PeriodScheduler:
+    """One task that sleeps until the next bell of any subscribed class.
+
+    Each tracked class sits in a heap keyed by its next boundary. On waking
+    it re-evaluates only the classes that are due (plus newly tracked ones,
+    or all of them after a reload), encodes each changed class's event once
+    and hands the same bytes to every queue subscribed to that class. A
+    shared heartbeat keeps idle connections alive through proxies without a
+    timer per connection.
+
+    Other fan-out layers (the WebSocket hub) ``watch`` classes instead of
+    holding queues and receive transitions through listeners.
+    """
+
+    def __init__(self, get_index: Callable[[], TimetableIndex], describe: Describe,
+                 clock: Callable[[], float] = time.time, event: str = "period",
+                 offload: Optional[Offload] = None):
+        self.get_index = get_index
+        self.clock = clock
+        self.describe = describe
+        self.offload = offload
+        self.event = event
+        self._subscribers: Dict[str, Set["asyncio.Queue[bytes]"]] = {}
+        self._watched: Dict[str, int] = {}
+        self._listeners: List[TransitionListener] = []
+        self._last: Dict[str, Tuple[Any, ...]] = {}
+        # (timestamp, class) per next boundary; entries that no longer match _next are stale.
+        self._heap: List[Tuple[float, str]] = []
+        self._next: Dict[str, float] = {}
+        self._due_now: Set[str] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    # === Lifecycle ===
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self, *_: Any) -> None:
+        # Safe to call from any thread, e.g. the timetable reloader: every class is re-described.
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._make_due, list(self._tracked()))
+
+    def _make_due(self, classes: Iterable[str]) -> None:
+        self._due_now.update(classes)
+        if self._due_now and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _tracked(self) -> Set[str]:
+        return set(self._subscribers) | set(self._watched)
+
+    def _is_tracked(self, class_name: str) -> bool:
+        return class_name in self._subscribers or class_name in self._watched
+
+    # === Subscriptions ===
+    def subscribe(self, classes: Iterable[str]) -> "asyncio.Queue[bytes]":
+        queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=QUEUE_SIZE)
+        added = []
+        for class_name in classes:
+            if not self._is_tracked(class_name):
+                added.append(class_name)
+            self._subscribers.setdefault(class_name, set()).add(queue)
+        # Only classes nobody tracked yet need a first answer; the rest keep their place in the heap.
+        self._make_due(added)
+        return queue
+
+    def unsubscribe(self, queue: "asyncio.Queue[bytes]", classes: Iterable[str]) -> None:
+        for class_name in classes:
+            queues = self._subscribers.get(class_name)
+            if queues is None:
+                continue
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[class_name]
+                self._forget(class_name)
+
+    def add_listener(self, listener: TransitionListener) -> None:
+        self._listeners.append(listener)
+
+    def watch(self, class_name: str) -> None:
+        added = not self._is_tracked(class_name)
+        self._watched[class_name] = self._watched.get(class_name, 0) + 1
+        if added:
+            self._make_due([class_name])
+
+    def unwatch(self, class_name: str) -> None:
+        count = self._watched.get(class_name, 0) - 1
+        if count > 0:
+            self._watched[class_name] = count
+        else:
+            self._watched.pop(class_name, None)
+            self._forget(class_name)
+
+    def _forget(self, class_name: str) -> None:
+        if not self._is_tracked(class_name):
+            self._last.pop(class_name, None)
+            self._next.pop(class_name, None)
+            self._due_now.discard(class_name)
+
+    async def describe_all(self, classes: List[str], now: float) -> List[Tuple[Dict[str, Any], float]]:
+        # One batch per call, so an offloaded describe costs one hop however many classes there are.
+        index = self.get_index()
+
+        def describe() -> List[Tuple[Dict[str, Any], float]]:
+            return [self.describe(index, class_name, now) for class_name in classes]
+
+        return await self.offload(describe) if self.offload else describe()
+
+    async def current(self, classes: Iterable[str]) -> List[Dict[str, Any]]:
+        return [payload for payload, _ in await self.describe_all(list(classes), self.clock())]
+
+    async def snapshot(self, classes: Iterable[str]) -> List[bytes]:
+        return [sse_event(self.event, payload) for payload in await self.current(classes)]
+
+    @property
+    def connections(self) -> int:
+        return len({id(q) for queues in self._subscribers.values() for q in queues})
+
+    # === Loop ===
+    async def _run(self) -> None:
+        last_heartbeat = self._loop.time()
+        while True:
+            self._wakeup.clear()
+            try:
+                delay = await self._tick()
+            except Exception:
+                logger.exception("Period scheduler tick failed")
+                delay = HEARTBEAT_SECONDS
+            now = self._loop.time()
+            if now - last_heartbeat >= HEARTBEAT_SECONDS:
+                last_heartbeat = now
+                for queue in {q for queues in self._subscribers.values() for q in queues}:
+                    push_latest(queue, HEARTBEAT)
+            delay = min(delay, HEARTBEAT_SECONDS - (now - last_heartbeat))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0.05))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _tick(self) -> float:
+        now = self.clock()
+        due, self._due_now = self._due_now, set()
+        while self._heap and self._heap[0][0] <= now:
+            at, class_name = heapq.heappop(self._heap)
+            if self._next.get(class_name) == at:
+                due.add(class_name)
+        classes = [c for c in due if self._is_tracked(c)]
+        if classes:
+            try:
+                described = await self.describe_all(classes, now)
+            except Exception:
+                self._due_now.update(classes)  # retried on the next wake-up
+                raise
+            for class_name, (payload, until) in zip(classes, described):
+                if not self._is_tracked(class_name):
+                    continue  # dropped while the batch was being described
+                key = tuple(v for k, v in payload.items() if k != "time")
+                previous = self._last.get(class_name)
+                self._last[class_name] = key
+                if previous is not None and previous != key:
+                    queues = self._subscribers.get(class_name)
+                    if queues:
+                        chunk = sse_event(self.event, payload)
+                        for queue in queues:
+                            push_latest(queue, chunk)
+                    for listener in self._listeners:
+                        try:
+                            listener(class_name, payload)
+                        except Exception:
+                            logger.exception("Period transition listener failed")
+                # Wake just after the boundary so the new minute is already current.
+                at = now + until + 0.05
+                self._next[class_name] = at
+                heapq.heappush(self._heap, (at, class_name))
+        # Drop stale entries from the top so the sleep is computed from a live boundary.
+        while self._heap and self._next.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return HEARTBEAT_SECONDS
+        return min(HEARTBEAT_SECONDS, self._heap[0][0] - self.clock())
@@ -0,0 +1,102 @@
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# === Encoding ===
+def _encode_stdlib(payload: Any) -> bytes:
+    # Same settings as Starlette's JSONResponse, so cached bodies are byte-identical.
+    return json.dumps(
+        payload,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+def _encode_orjson(payload: Any) -> bytes:
+    # orjson also writes compact UTF-8, so the bytes match the stdlib path for our payloads.
+    try:
+        return orjson.dumps(payload)
+    except TypeError:
+        return _encode_stdlib(payload)
+
+encode_json = _encode_orjson if orjson is not None else _encode_stdlib
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison (RFC 7232 §3.2), so W/ prefixes are ignored.
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+# === Cache ===
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+class ResponseCache:
+    """Ready-to-send bodies for read-only routes, scoped to one timetable version.
+
+    Bodies are JSON unless the caller passes another ``encode`` (the .ics feed
+    builds its bytes itself).
+
+    The (version, entries) pair is swapped as a whole, so a request still
+    running against an older timetable can never write into the new map.
+    With ``maxsize`` the entries form an LRU, for keys that clients choose
+    freely (arbitrary dates) and would otherwise grow without limit.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._state: Tuple[Any, Dict[Hashable, CachedResponse]] = (None, self._entries())
+
+    def _entries(self) -> Dict[Hashable, CachedResponse]:
+        return OrderedDict() if self.maxsize else {}
+
+    def get(self, version: Any, key: Hashable, build: Callable[[], Any],
+            encode: Callable[[Any], bytes] = encode_json) -> CachedResponse:
+        state = self._state
+        if state[0] != version:
+            state = (version, self._entries())
+            self._state = state
+        entries = state[1]
+        entry = entries.get(key)
+        if entry is None:
+            body = encode(build())
+            entry = CachedResponse(body, make_etag(body))
+            if not self.maxsize:
+                entries[key] = entry
+                return entry
+            with self._lock:
+                entries[key] = entry
+                while len(entries) > self.maxsize:
+                    entries.popitem(last=False)
+        elif self.maxsize:
+            with self._lock:
+                if key in entries:
+                    entries.move_to_end(key)
+        return entry
+
+    def clear(self) -> None:
+        self._state = (None, self._entries())
+
+    def __len__(self) -> int:
+        return len(self._state[1])
@@ -0,0 +1,551 @@
+from typing import Optional, List, Dict, Any, Tuple, Iterator, NamedTuple, Sequence, Union
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from functools import lru_cache
+from heapq import merge
+import hashlib
+import json
+import os
+import sys
+import unicodedata
+from zoneinfo import ZoneInfoNotFoundError
+
+from clock import DAY_NAMES, DEFAULT_TIMEZONE, get_zone
+
+# === Constants ===
+DAYS = DAY_NAMES
+
+# === Period Records ===
+# Every subject, class name and time string goes through sys.intern, so the
+# thousands of "Lunch Break" / "09:20" occurrences share one object each.
+intern = sys.intern
+
+def _optional_name(value: Any) -> Optional[str]:
+    # Teachers and rooms may be written as numbers ("room": 204, even 0); only absent or "" means unset.
+    if value is None:
+        return None
+    value = str(value)
+    return intern(value) if value else None
+
+class Period:
+    __slots__ = ("subject", "start_time", "end_time", "teacher", "room")
+
+    def __init__(self, subject: str, start_time: str, end_time: str,
+                 teacher: Optional[Union[str, int]] = None, room: Optional[Union[str, int]] = None):
+        self.subject = intern(subject)
+        self.start_time = intern(start_time)
+        self.end_time = intern(end_time)
+        self.teacher = _optional_name(teacher)
+        self.room = _optional_name(room)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Period":
+        return cls(data["subject"], data["start_time"], data["end_time"], data.get("teacher"), data.get("room"))
+
+    def as_dict(self) -> Dict[str, str]:
+        # Teacher and room are optional in timetable.json and only emitted when set.
+        out = {"subject": self.subject, "start_time": self.start_time, "end_time": self.end_time}
+        if self.teacher:
+            out["teacher"] = self.teacher
+        if self.room:
+            out["room"] = self.room
+        return out
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Period):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in Period.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, f) for f in Period.__slots__))
+
+    def __repr__(self) -> str:
+        return f"Period({self.subject!r}, {self.start_time!r}, {self.end_time!r}, {self.teacher!r}, {self.room!r})"
+
+class Booking(Period):
+    """A period seen from a teacher or room, remembering which class it belongs to."""
+    __slots__ = ("class_name",)
+
+    def __init__(self, class_name: str, period: Period):
+        super().__init__(period.subject, period.start_time, period.end_time, period.teacher, period.room)
+        self.class_name = class_name
+
+MINUTES_PER_DAY = 24 * 60
+
+class NowAnswer(NamedTuple):
+    current: Optional[Period]
+    upcoming: Optional[Period]
+    message: str
+    until: int  # minute of day at which this answer stops being valid
+
+# === Helpers ===
+def normalize_class_name(class_name: str) -> str:
+    return " ".join(class_name.split()).casefold()
+
+def normalize_day(day: str) -> str:
+    return day.strip().capitalize()
+
+def parse_minutes(time_str: str) -> int:
+    hours, minutes = time_str.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def format_minutes(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def period_message(current: Optional[Period], upcoming: Optional[Period]) -> str:
+    if current:
+        return intern(f"🟢 Current class: {current.subject}")
+    if upcoming:
+        return intern(f"⏭️ No class now. Next: {upcoming.subject}")
+    return "🏁 School might be over for the day."
+
+def iter_classes(data: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    # Current format: {"classes": {"10A": {...}, "10B": {...}}}
+    for class_name, spec in data.get("classes", {}).items():
+        yield class_name, spec
+    # Legacy single-class format: {"class": "10A", "daily_schedule": {...}}
+    if "class" in data and "daily_schedule" in data:
+        yield data["class"], data
+
+# === Day Schedule ===
+class DaySchedule:
+    """One class-day, sorted by start with parallel minute-of-day arrays.
+
+    A minute table maps every minute between the first start and the last
+    end to a precomputed NowAnswer (one per segment between bell times), so
+    answering "what is on now" is a bounds check plus an index. The table is
+    built on the first lookup, so loading thousands of class-days (above all
+    from the binary snapshot) only pays for the days that are actually asked
+    about.
+    """
+
+    __slots__ = ("periods", "starts", "ends", "_compiled")
+
+    def __init__(self, periods: List[Period],
+                 starts: Optional[Sequence[int]] = None, ends: Optional[Sequence[int]] = None):
+        if starts is None or ends is None:
+            periods = sorted(periods, key=lambda p: parse_minutes(p.start_time))
+            starts = [parse_minutes(p.start_time) for p in periods]
+            ends = [parse_minutes(p.end_time) for p in periods]
+        # Precompiled callers (the binary snapshot) pass arrays already sorted.
+        self.periods: List[Period] = periods
+        self.starts = array("H", starts)
+        self.ends = array("H", ends)
+        self._compiled: Optional[Tuple[List[NowAnswer], array, NowAnswer, NowAnswer]] = None
+
+    def _build_table(self) -> Tuple[List[NowAnswer], array, NowAnswer, NowAnswer]:
+        # Built into locals and published with one assignment; a concurrent first
+        # lookup at worst builds an identical table twice.
+        answers: List[NowAnswer] = []
+        table = array("H")
+        after = NowAnswer(None, None, period_message(None, None), MINUTES_PER_DAY)
+        before = after
+        if self.periods:
+            before = self._answer_at(-1, self.starts[0])
+            # One answer per segment between boundaries, shared by all its minutes.
+            boundaries = sorted(set(self.starts) | set(self.ends))
+            for lo, hi in zip(boundaries, boundaries[1:]):
+                table.extend([len(answers)] * (hi - lo))
+                answers.append(self._answer_at(lo, hi))
+        self._compiled = (answers, table, before, after)
+        return self._compiled
+
+    def _answer_at(self, minute: int, until: int) -> NowAnswer:
+        current, upcoming, _ = self.locate(minute)
+        return NowAnswer(current, upcoming, period_message(current, upcoming), until)
+
+    @property
+    def start(self) -> Optional[int]:
+        return self.starts[0] if self.starts else None
+
+    @property
+    def end(self) -> Optional[int]:
+        return self.ends[-1] if self.ends else None
+
+    def now(self, minute: int) -> NowAnswer:
+        answers, table, before, after = self._compiled or self._build_table()
+        offset = minute - self.starts[0] if self.starts else -1
+        if offset < 0:
+            return before
+        if offset >= len(table):
+            return after
+        return answers[table[offset]]
+
+    def locate(self, minute: int) -> Tuple[Optional[Period], Optional[Period], Optional[Period]]:
+        # (current, next, previous) from a single bisect over the start times.
+        i = bisect_right(self.starts, minute)
+        current = self.periods[i - 1] if i and minute < self.ends[i - 1] else None
+        upcoming = self.periods[i] if i < len(self.periods) else None
+        if current is not None:
+            previous = self.periods[i - 2] if i > 1 else None
+        else:
+            previous = self.periods[i - 1] if i else None
+        return current, upcoming, previous
+
+EMPTY_DAY = DaySchedule([])
+
+# === Teacher and Room Index ===
+RESOURCES = ("teacher", "room")
+
+class ResourceIndex:
+    """Reverse index from a teacher or room to its bookings, one DaySchedule per day.
+
+    Built from the same compiled class-days as the class index, so "where is
+    teacher X now" and "is room 204 free" are the same O(1) minute-table
+    lookup as "what is 10A doing now".
+    """
+
+    __slots__ = ("dimension", "names", "_keys", "_days")
+
+    def __init__(self, dimension: str, class_days: Iterator[Tuple[str, str, DaySchedule]]):
+        self.dimension = dimension
+        self._keys: Dict[str, str] = {}
+        bookings: Dict[Tuple[str, str], List[Booking]] = {}
+        for class_name, day, compiled in class_days:
+            for period in compiled.periods:
+                name = getattr(period, dimension)
+                if not name:
+                    continue
+                name = self._keys.setdefault(normalize_class_name(name), name)
+                bookings.setdefault((name, day), []).append(Booking(class_name, period))
+        self.names: List[str] = sorted(self._keys.values())
+        self._days: Dict[Tuple[str, str], DaySchedule] = {
+            key: DaySchedule(periods) for key, periods in bookings.items()
+        }
+
+    def resolve(self, name: str) -> Optional[str]:
+        return self._keys.get(normalize_class_name(name))
+
+    def get_day(self, name: str, day: str) -> DaySchedule:
+        return self._days.get((name, day), EMPTY_DAY)
+
+# === Subject Search ===
+Posting = Tuple[int, str, str, Period]  # (sequence, class, day, period)
+NGRAM = 3
+
+def normalize_subject(subject: str) -> str:
+    return " ".join(subject.split()).casefold()
+
+def subject_tokens(text: str) -> List[str]:
+    # Word starts for prefix search in any script. Combining marks (accents, Devanagari
+    # vowel signs and virama) stay in their word; \W alone would split "व्याकरण" apart.
+    return "".join(c if c.isalnum() or unicodedata.category(c)[0] == "M" else " " for c in text).split()
+
+class SubjectIndex:
+    """Inverted index from subject text to (class, day, period) postings.
+
+    Subjects are few compared to periods, so queries are resolved against the
+    distinct subjects first: 1- to 3-gram sets answer substring queries and a
+    sorted token list answers prefix queries. Matching subjects' postings are
+    then merged back into timetable order.
+    """
+
+    def __init__(self, periods: Iterator[Tuple[str, str, Period]]):
+        self._subject_ids: Dict[str, int] = {}
+        self._normalized: List[str] = []
+        self._postings: List[List[Posting]] = []
+        for seq, (class_name, day, period) in enumerate(periods):
+            sid = self._subject_ids.get(period.subject)
+            if sid is None:
+                sid = self._subject_ids[period.subject] = len(self._normalized)
+                self._normalized.append(normalize_subject(period.subject))
+                self._postings.append([])
+            self._postings[sid].append((seq, class_name, day, period))
+
+        self._grams: Dict[str, List[int]] = {}
+        tokens = set()
+        for sid, text in enumerate(self._normalized):
+            grams = {text[i:i + n] for n in range(1, NGRAM + 1) for i in range(len(text) - n + 1)}
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(sid)
+            tokens.add((text, sid))
+            tokens.update((token, sid) for token in subject_tokens(text))
+        ordered = sorted(tokens)
+        self._tokens: List[str] = [token for token, _ in ordered]
+        self._token_subjects: List[int] = [sid for _, sid in ordered]
+
+    def _substring_subjects(self, query: str) -> List[int]:
+        if len(query) <= NGRAM:
+            return self._grams.get(query, [])
+        gram_sets = []
+        for i in range(len(query) - NGRAM + 1):
+            gram = self._grams.get(query[i:i + NGRAM])
+            if not gram:
+                return []
+            gram_sets.append(gram)
+        candidates = set(min(gram_sets, key=len))
+        for gram in gram_sets:
+            candidates.intersection_update(gram)
+        # Grams can match out of order, so confirm against the subject itself.
+        return [sid for sid in candidates if query in self._normalized[sid]]
+
+    def _prefix_subjects(self, query: str) -> List[int]:
+        matched = set()
+        i = bisect_left(self._tokens, query)
+        while i < len(self._tokens) and self._tokens[i].startswith(query):
+            matched.add(self._token_subjects[i])
+            i += 1
+        return list(matched)
+
+    def search(self, query: str, match: str = "substring",
+               class_name: Optional[str] = None, day: Optional[str] = None) -> List[Tuple[str, str, Period]]:
+        query = normalize_subject(query)
+        if not query:
+            subject_ids = list(range(len(self._normalized)))
+        elif match == "prefix":
+            subject_ids = self._prefix_subjects(query)
+        else:
+            subject_ids = self._substring_subjects(query)
+        postings = merge(*(self._postings[sid] for sid in subject_ids))
+        return [
+            (c, d, period) for _, c, d, period in postings
+            if (class_name is None or c == class_name) and (day is None or d == day)
+        ]
+
+# === Calendar Overlay ===
+# timetable.json may carry dated exceptions on top of the weekly schedule:
+#   "weekly_offs": ["Sunday"]                      (top level or per class)
+#   "calendar": {"2026-11-12": {"type": "holiday", "name": "Diwali"},
+#                "2026-11-14": [{"type": "half_day", "end": "12:20"},
+#                               {"type": "substitution", "classes": ["10A"],
+#                                "periods": [{"subject": ..., "start_time": ..., "end_time": ...}]}]}
+# Entries for a date apply in order; "classes" limits an entry to some classes.
+CALENDAR_KINDS = ("holiday", "half_day", "exam", "substitution", "working_day")
+CALENDAR_CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", "4096"))
+
+class CalendarEntry:
+    __slots__ = ("kind", "name", "classes", "follow", "end", "periods", "spans")
+
+    def __init__(self, spec: Dict[str, Any], class_keys: Dict[str, str]):
+        self.kind: str = spec.get("type", "holiday")
+        if self.kind not in CALENDAR_KINDS:
+            raise ValueError(f"Unknown calendar entry type {self.kind!r}, expected one of {CALENDAR_KINDS}")
+        self.name: str = intern(spec.get("name") or self.kind.replace("_", " ").title())
+        # Class names are matched like everywhere else ("10a" is 10A); unknown ones are an error.
+        classes = spec.get("classes")
+        self.classes: Optional[frozenset] = None
+        if classes:
+            resolved = [class_keys.get(normalize_class_name(c)) for c in classes]
+            unknown = [c for c, found in zip(classes, resolved) if found is None]
+            if unknown:
+                raise ValueError(f"Calendar entry names unknown class(es): {', '.join(unknown)}")
+            self.classes = frozenset(resolved)
+        # Run another weekday's timetable, e.g. a Saturday that follows Monday.
+        follow = spec.get("follow")
+        self.follow: Optional[str] = normalize_day(follow) if follow else None
+        if self.follow is not None and self.follow not in DAYS:
+            raise ValueError(f"Calendar entry follows unknown day {follow!r}")
+        self.end: Optional[int] = parse_minutes(spec["end"]) if self.kind == "half_day" else None
+        self.periods: List[Period] = [
+            Period.from_dict(p) for p in spec.get("schedule" if self.kind == "exam" else "periods", [])
+        ]
+        # Parsed here so a bad time fails the load, not the first request for that date.
+        self.spans: List[Tuple[int, int]] = []
+        for p in self.periods:
+            try:
+                start, end = parse_minutes(p.start_time), parse_minutes(p.end_time)
+            except ValueError as e:
+                raise ValueError(f"Calendar {self.kind} period {p.subject!r} has an invalid time (expected HH:MM)") from e
+            if end <= start:
+                raise ValueError(f"Calendar {self.kind} period {p.subject!r} ends at {p.end_time}, not after it starts")
+            self.spans.append((start, end))
+
+    def applies_to(self, class_name: str) -> bool:
+        return self.classes is None or class_name in self.classes
+
+class EffectiveDay(NamedTuple):
+    """What one class actually runs on one date, after the calendar overlay."""
+    schedule: DaySchedule
+    holiday: Optional[str] = None  # weekday or holiday name when there is no school
+    note: Optional[str] = None     # calendar entries applied; None on a plain weekly day
+
+def parse_calendar(raw: Dict[str, Any], class_keys: Dict[str, str]) -> Dict[str, Tuple[CalendarEntry, ...]]:
+    calendar = {}
+    for day, specs in raw.items():
+        try:
+            key = date.fromisoformat(day).isoformat()
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Calendar dates must be YYYY-MM-DD, got {day!r}") from e
+        if isinstance(specs, dict):
+            specs = [specs]
+        calendar[key] = tuple(CalendarEntry(spec, class_keys) for spec in specs)
+    return calendar
+
+def parse_weekly_offs(days: Any) -> frozenset:
+    offs = frozenset(normalize_day(d) for d in days)
+    unknown = offs.difference(DAYS)
+    if unknown:
+        raise ValueError(f"Unknown weekly off day(s): {sorted(unknown)}")
+    return offs
+
+def apply_entry(periods: List[Period], entry: CalendarEntry) -> List[Period]:
+    if entry.kind == "exam":
+        return list(entry.periods)
+    if entry.kind == "half_day":
+        kept = []
+        for p in periods:
+            if parse_minutes(p.start_time) >= entry.end:
+                continue
+            if parse_minutes(p.end_time) > entry.end:
+                p = Period(p.subject, p.start_time, format_minutes(entry.end), p.teacher, p.room)
+            kept.append(p)
+        return kept
+    if entry.kind == "substitution":
+        for sub, (start, end) in zip(entry.periods, entry.spans):
+            periods = [p for p in periods
+                       if parse_minutes(p.end_time) <= start or parse_minutes(p.start_time) >= end]
+            periods.append(sub)
+        return periods
+    return periods
+
+def _check_zone(name: Any) -> str:
+    # Resolved once here so a typo is rejected at load instead of on the first request.
+    try:
+        get_zone(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError) as e:
+        raise ValueError(f"Unknown timezone in timetable: {name!r}") from e
+    return intern(name)
+
+# === Compiled Index ===
+class TimetableIndex:
+    """Timetable compiled once at load time; every lookup is a dict hit.
+
+    ``data`` is the timetable.json document. A loader that already holds
+    compiled day schedules (the binary snapshot) passes them as ``days``
+    together with the source ``version`` and a ``data`` without schedules.
+    """
+
+    def __init__(self, data: Dict[str, Any], version: Optional[str] = None,
+                 days: Optional[Dict[str, Dict[str, DaySchedule]]] = None):
+        self.version: str = version or hashlib.sha256(
+            json.dumps(data, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        self.settings: Dict[str, Any] = {
+            k: v for k, v in data.items() if k not in ("classes", "class", "daily_schedule")
+        }
+        self.timezone: str = _check_zone(self.settings.get("timezone", DEFAULT_TIMEZONE))
+        self.weekly_offs = parse_weekly_offs(self.settings.get("weekly_offs", ["Sunday"]))
+        self.classes: List[str] = []
+        self.class_meta: Dict[str, Dict[str, Any]] = {}
+        self._zones: Dict[str, str] = {}
+        self._offs: Dict[str, frozenset] = {}
+        self._class_keys: Dict[str, str] = {}
+        self._weeks: Dict[str, Dict[str, List[Period]]] = {}
+        self._days: Dict[Tuple[str, str], DaySchedule] = {}
+        subjects = set()
+
+        for class_name, spec in iter_classes(data):
+            key = normalize_class_name(class_name)
+            if key in self._class_keys:
+                raise ValueError(f"Duplicate class in timetable: {class_name}")
+            class_name = intern(class_name)
+            self._class_keys[key] = class_name
+            self.classes.append(class_name)
+            self.class_meta[class_name] = {
+                k: v for k, v in spec.items() if k not in ("class", "classes", "daily_schedule")
+            }
+            self._zones[class_name] = _check_zone(spec.get("timezone", self.timezone))
+            if "weekly_offs" in spec:
+                self._offs[class_name] = parse_weekly_offs(spec["weekly_offs"])
+
+            if days is not None:
+                compiled_days = days.get(class_name, {})
+            else:
+                compiled_days = {
+                    normalize_day(day): DaySchedule([Period.from_dict(p) for p in periods])
+                    for day, periods in spec.get("daily_schedule", {}).items()
+                }
+
+            week: Dict[str, List[Period]] = {}
+            for day, compiled in compiled_days.items():
+                week[day] = compiled.periods
+                self._days[(class_name, day)] = compiled
+                subjects.update(p.subject for p in compiled.periods)
+            self._weeks[class_name] = week
+
+        self.calendar = parse_calendar(self.settings.get("calendar", {}), self._class_keys)
+        self.subjects: List[str] = sorted(subjects)
+        self.subject_index = SubjectIndex(self.iter_periods())
+
+        # Plain weekly days are answered from this table; only dates with calendar
+        # entries are materialised, on demand, behind a bounded LRU.
+        self._weekly: Dict[Tuple[str, str], EffectiveDay] = {
+            (class_name, day): (
+                EffectiveDay(EMPTY_DAY, holiday=day) if self.is_weekly_off(class_name, day)
+                else EffectiveDay(self._days.get((class_name, day), EMPTY_DAY))
+            )
+            for class_name in self.classes for day in DAYS
+        }
+        self._overlay = lru_cache(maxsize=CALENDAR_CACHE_SIZE)(self._materialise)
+        self.resources: Dict[str, ResourceIndex] = {
+            dimension: ResourceIndex(dimension, (
+                (class_name, day, self.weekly_day(class_name, day).schedule)
+                for class_name in self.classes for day in DAYS
+            ))
+            for dimension in RESOURCES
+        }
+        self._resource_overlay = lru_cache(maxsize=CALENDAR_CACHE_SIZE)(self._materialise_resources)
+
+    def resolve_class(self, class_name: str) -> Optional[str]:
+        return self._class_keys.get(normalize_class_name(class_name))
+
+    def timezone_for(self, class_name: str) -> str:
+        return self._zones.get(class_name, self.timezone)
+
+    def get_day(self, class_name: str, day: str) -> Optional[DaySchedule]:
+        return self._days.get((class_name, day))
+
+    def is_weekly_off(self, class_name: str, day: str) -> bool:
+        return day in self._offs.get(class_name, self.weekly_offs)
+
+    def weekly_day(self, class_name: str, day: str) -> EffectiveDay:
+        return self._weekly.get((class_name, day)) or EffectiveDay(EMPTY_DAY)
+
+    def effective_day(self, class_name: str, on: str, day: str) -> EffectiveDay:
+        """Schedule of ``class_name`` on the ISO date ``on``, which falls on weekday ``day``."""
+        if on not in self.calendar:
+            return self.weekly_day(class_name, day)
+        return self._overlay(class_name, on, day)
+
+    def _materialise(self, class_name: str, on: str, day: str) -> EffectiveDay:
+        entries = [e for e in self.calendar[on] if e.applies_to(class_name)]
+        if not entries:
+            return self.weekly_day(class_name, day)
+        note = intern(", ".join(e.name for e in entries))
+        for entry in entries:
+            if entry.kind == "holiday":
+                return EffectiveDay(EMPTY_DAY, holiday=entry.name, note=note)
+        base_day = next((e.follow for e in entries if e.follow), day)
+        closed = self.is_weekly_off(class_name, base_day) and not any(e.kind == "working_day" for e in entries)
+        if closed:
+            return EffectiveDay(EMPTY_DAY, holiday=base_day, note=note)
+        periods = list(self.get_schedule(class_name, base_day) or [])
+        for entry in entries:
+            periods = apply_entry(periods, entry)
+        return EffectiveDay(DaySchedule(periods), note=note)
+
+    def resource_day(self, dimension: str, name: str, on: str, day: str) -> DaySchedule:
+        """Bookings of a teacher or room on the ISO date ``on``, after the calendar overlay."""
+        if on not in self.calendar:
+            return self.resources[dimension].get_day(name, day)
+        return self._resource_overlay(dimension, on, day).get_day(name, day)
+
+    def _materialise_resources(self, dimension: str, on: str, day: str) -> ResourceIndex:
+        # A calendar date can move every class at once, so its reverse index is rebuilt whole.
+        return ResourceIndex(dimension, (
+            (class_name, day, self.effective_day(class_name, on, day).schedule) for class_name in self.classes
+        ))
+
+    def get_schedule(self, class_name: str, day: str) -> Optional[List[Period]]:
+        compiled = self._days.get((class_name, day))
+        return compiled.periods if compiled is not None else None
+
+    def get_week(self, class_name: str) -> Optional[Dict[str, List[Period]]]:
+        return self._weeks.get(class_name)
+
+    def iter_periods(self) -> Iterator[Tuple[str, str, Period]]:
+        for class_name in self.classes:
+            for day, periods in self._weeks[class_name].items():
+                for period in periods:
+                    yield class_name, day, period
@@ -0,0 +1,96 @@
+from typing import Callable, List, Optional, Tuple
+import logging
+import os
+import threading
+
+from timetable_index import TimetableIndex
+from timetable_snapshot import load_with_snapshot
+from timetable_validate import load_valid_index
+
+logger = logging.getLogger(__name__)
+
+ReloadListener = Callable[[TimetableIndex], None]
+
+# === Reloader ===
+class TimetableReloader:
+    """Owns the live TimetableIndex and swaps in a new one when the file changes.
+
+    A replacement index is parsed and compiled completely off the request
+    path, then published with a single attribute assignment. Readers take
+    ``reloader.index`` once per request and never see a half-built index.
+    """
+
+    def __init__(self, path: str, interval: float = 2.0, snapshot_path: Optional[str] = None):
+        self.path = path
+        self.interval = interval
+        self.snapshot_path = snapshot_path
+        self._stamp = self._file_stamp()
+        self.index: TimetableIndex = self._build()
+        self._listeners: List[ReloadListener] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_stamp(self) -> Tuple[int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _build(self) -> TimetableIndex:
+        if self.snapshot_path:
+            index = load_with_snapshot(self.path, self.snapshot_path)
+        else:
+            index = load_valid_index(self.path)
+        if not index.classes:
+            raise ValueError(f"{self.path} does not define any classes")
+        return index
+
+    def subscribe(self, listener: ReloadListener) -> None:
+        self._listeners.append(listener)
+
+    def check(self) -> bool:
+        try:
+            stamp = self._file_stamp()
+        except OSError as e:
+            logger.warning(f"Timetable file unavailable, keeping current index: {e}")
+            return False
+        if stamp == self._stamp:
+            return False
+        self._stamp = stamp
+        return self.reload()
+
+    def reload(self) -> bool:
+        with self._lock:
+            try:
+                index = self._build()
+            except Exception as e:
+                # A half-written or invalid file must never replace a good index.
+                logger.error(f"Timetable reload rejected, keeping version {self.index.version}: {e}")
+                return False
+            if index.version == self.index.version:
+                return False
+            self.index = index
+        logger.info(f"Timetable reloaded: version {index.version}, {len(index.classes)} classes")
+        for listener in self._listeners:
+            try:
+                listener(index)
+            except Exception:
+                logger.exception("Timetable reload listener failed")
+        return True
+
+    # === Background Watcher ===
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="timetable-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
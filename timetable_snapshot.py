@@ -0,0 +1,222 @@
+from typing import Any, Dict, List, Optional, Tuple
+from array import array
+import json
+import logging
+import os
+import struct
+import sys
+
+from timetable_index import DaySchedule, Period, TimetableIndex, DAYS
+from timetable_validate import TimetableValidationError, load_valid_index
+
+logger = logging.getLogger(__name__)
+
+# === Format ===
+# Little-endian, sections laid out back to back and padded to 4 bytes:
+#   header
+#   meta JSON        (settings + per-class metadata, everything except periods)
+#   string offsets   u32[n_strings + 1]
+#   string blob      utf-8, every distinct string stored once
+#   class directory  u32[n_classes * 3]  (name id, first day row, day count)
+#   day table        u32[n_days * 3]     (weekday number, first period row, period count)
+#   period columns   u32 subject[n], u32 start_str[n], u32 end_str[n], u32 teacher[n], u32 room[n],
+#                    u16 start[n], u16 end[n]   (teacher/room are NO_STRING when unset)
+# The JSON file stays the source of truth; a snapshot is only used while its
+# recorded source mtime and size still match, and is only ever written from
+# a timetable that passed timetable_validate.
+MAGIC = b"SSTT"
+FORMAT_VERSION = 3
+NO_STRING = 0xFFFFFFFF
+HEADER = struct.Struct("<4sHHIIIIIIqQ16s")
+
+def _pad(n: int) -> int:
+    return (n + 3) & ~3
+
+def _column(typecode: str, values: List[int]) -> bytes:
+    col = array(typecode, values)
+    if sys.byteorder == "big":
+        col.byteswap()
+    return col.tobytes()
+
+def _read_column(typecode: str, buf, offset: int, count: int) -> Tuple[array, int]:
+    col = array(typecode)
+    end = offset + count * col.itemsize
+    col.frombytes(buf[offset:end])
+    if sys.byteorder == "big":
+        col.byteswap()
+    return col, end
+
+def source_stamp(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+# === Writer ===
+def write_snapshot(index: TimetableIndex, snapshot_path: str, stamp: Tuple[int, int]) -> None:
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        sid = string_ids.get(value)
+        if sid is None:
+            sid = string_ids[value] = len(strings)
+            strings.append(value)
+        return sid
+
+    class_rows: List[int] = []
+    day_rows: List[int] = []
+    starts: List[int] = []
+    ends: List[int] = []
+    subjects: List[int] = []
+    start_strs: List[int] = []
+    end_strs: List[int] = []
+    teachers: List[int] = []
+    rooms: List[int] = []
+    for class_name in index.classes:
+        week = index.get_week(class_name)
+        class_rows += [intern(class_name), len(day_rows) // 3, len(week)]
+        for day in week:
+            compiled = index.get_day(class_name, day)
+            day_rows += [DAYS.index(day), len(starts), len(compiled.periods)]
+            for period, start, end in zip(compiled.periods, compiled.starts, compiled.ends):
+                starts.append(start)
+                ends.append(end)
+                subjects.append(intern(period.subject))
+                start_strs.append(intern(period.start_time))
+                end_strs.append(intern(period.end_time))
+                teachers.append(intern(period.teacher) if period.teacher else NO_STRING)
+                rooms.append(intern(period.room) if period.room else NO_STRING)
+
+    meta = json.dumps({
+        "settings": index.settings,
+        "classes": [index.class_meta[name] for name in index.classes],
+    }).encode("utf-8")
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw))
+    blob = b"".join(encoded)
+
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, len(meta), len(strings), len(blob),
+        len(index.classes), len(day_rows) // 3, len(starts), stamp[0], stamp[1],
+        index.version.encode("ascii")[:16].ljust(16, b"\0"),
+    )
+    parts = [
+        header,
+        meta.ljust(_pad(len(meta)), b"\0"),
+        _column("I", offsets),
+        blob.ljust(_pad(len(blob)), b"\0"),
+        _column("I", class_rows),
+        _column("I", day_rows),
+        _column("I", subjects),
+        _column("I", start_strs),
+        _column("I", end_strs),
+        _column("I", teachers),
+        _column("I", rooms),
+        _column("H", starts),
+        _column("H", ends),
+    ]
+    # Write next to the target and rename, so concurrent workers never read a partial file.
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        for part in parts:
+            f.write(part)
+    os.replace(tmp_path, snapshot_path)
+
+# === Reader ===
+def read_snapshot(snapshot_path: str, stamp: Optional[Tuple[int, int]] = None) -> Optional[TimetableIndex]:
+    """Load a snapshot, or return None when it is missing, stale or from another format version."""
+    # Every column is copied into Python objects below, so one plain read is as fast as a mapping.
+    try:
+        with open(snapshot_path, "rb") as f:
+            buf = memoryview(f.read())
+    except OSError:
+        return None
+    if len(buf) < HEADER.size:
+        return None
+    (magic, fmt, _, meta_len, n_strings, blob_len,
+     n_classes, n_days, n_periods, mtime_ns, size, version) = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or fmt != FORMAT_VERSION:
+        return None
+    if stamp is not None and (mtime_ns, size) != stamp:
+        return None
+
+    pos = HEADER.size
+    meta: Dict[str, Any] = json.loads(bytes(buf[pos:pos + meta_len]))
+    pos += _pad(meta_len)
+    offsets, pos = _read_column("I", buf, pos, n_strings + 1)
+    blob = bytes(buf[pos:pos + blob_len])
+    pos += _pad(blob_len)
+    strings = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(n_strings)]
+    class_rows, pos = _read_column("I", buf, pos, n_classes * 3)
+    day_rows, pos = _read_column("I", buf, pos, n_days * 3)
+    subjects, pos = _read_column("I", buf, pos, n_periods)
+    start_strs, pos = _read_column("I", buf, pos, n_periods)
+    end_strs, pos = _read_column("I", buf, pos, n_periods)
+    teachers, pos = _read_column("I", buf, pos, n_periods)
+    rooms, pos = _read_column("I", buf, pos, n_periods)
+    starts, pos = _read_column("H", buf, pos, n_periods)
+    ends, pos = _read_column("H", buf, pos, n_periods)
+
+    classes: Dict[str, Any] = {}
+    days: Dict[str, Dict[str, DaySchedule]] = {}
+    # Periods are immutable and heavily repeated across classes, so each distinct
+    # (subject, start, end, teacher, room) row becomes one shared Period object.
+    shared: Dict[Tuple[int, int, int, int, int], Period] = {}
+
+    def period(i: int) -> Period:
+        key = (subjects[i], start_strs[i], end_strs[i], teachers[i], rooms[i])
+        found = shared.get(key)
+        if found is None:
+            found = shared[key] = Period(
+                strings[key[0]], strings[key[1]], strings[key[2]],
+                strings[key[3]] if key[3] != NO_STRING else None,
+                strings[key[4]] if key[4] != NO_STRING else None)
+        return found
+
+    for c in range(n_classes):
+        name_id, first_day, day_count = class_rows[c * 3:c * 3 + 3]
+        class_name = strings[name_id]
+        classes[class_name] = meta["classes"][c]
+        week = days[class_name] = {}
+        for d in range(first_day, first_day + day_count):
+            day_no, first, count = day_rows[d * 3:d * 3 + 3]
+            periods = [period(i) for i in range(first, first + count)]
+            week[DAYS[day_no]] = DaySchedule(periods, starts[first:first + count], ends[first:first + count])
+
+    data = dict(meta["settings"], classes=classes)
+    return TimetableIndex(data, version=version.rstrip(b"\0").decode("ascii"), days=days)
+
+# === Loader ===
+def load_with_snapshot(json_path: str, snapshot_path: str) -> TimetableIndex:
+    # Fast path for worker start-up; falls back to the JSON and refreshes the snapshot.
+    stamp = source_stamp(json_path)
+    try:
+        index = read_snapshot(snapshot_path, stamp)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable timetable snapshot {snapshot_path}: {e}")
+        index = None
+    if index is not None:
+        return index
+    index = load_valid_index(json_path)
+    try:
+        write_snapshot(index, snapshot_path, stamp)
+    except OSError as e:
+        logger.warning(f"Could not write timetable snapshot {snapshot_path}: {e}")
+    return index
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compile timetable.json into a binary snapshot.")
+    parser.add_argument("source", nargs="?", default="timetable.json")
+    parser.add_argument("snapshot", nargs="?", default="timetable.snap")
+    args = parser.parse_args()
+    try:
+        compiled = load_valid_index(args.source)
+    except TimetableValidationError as e:
+        for issue in e.issues:
+            print(f"❌ {issue}")
+        raise SystemExit(f"❌ Refusing to write {args.snapshot}: {args.source} has errors")
+    write_snapshot(compiled, args.snapshot, source_stamp(args.source))
+    print(f"✅ Wrote {args.snapshot} ({len(compiled.classes)} classes, version {compiled.version})")
@@ -0,0 +1,285 @@
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from clock import DEFAULT_TIMEZONE, ClockSnapshot
+from database import pool as database_pool
+from db_executor import db_executor
+from db_pool import ConnectionPool
+from timetable_index import (
+    DAYS, EMPTY_DAY, DaySchedule, EffectiveDay, Period, TimetableIndex,
+    format_minutes, normalize_class_name, normalize_subject, parse_weekly_offs, subject_tokens
+)
+
+Match = Tuple[str, str, Period]  # (class, day, period)
+
+STORE_BACKENDS = ("index", "sqlite")
+
+# === Interface ===
+class TimetableStore:
+    """The read API every schedule route and the AI shortcut go through.
+
+    ``today`` answers for a class at one clock reading; ``day``, ``week``
+    and ``search`` read the weekly timetable. ``version`` changes whenever
+    the underlying data does, so responses can be cached per version.
+    Names mirror TimetableIndex where the index already has them.
+    ``blocking`` stores do I/O, so async callers go through ``read_store``.
+    """
+
+    backend = ""
+    blocking = False
+    timezone: str = DEFAULT_TIMEZONE
+
+    @property
+    def version(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def classes(self) -> List[str]:
+        raise NotImplementedError
+
+    @property
+    def subjects(self) -> List[str]:
+        raise NotImplementedError
+
+    def resolve_class(self, class_name: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def timezone_for(self, class_name: str) -> str:
+        return self.timezone
+
+    def is_weekly_off(self, class_name: str, day: str) -> bool:
+        raise NotImplementedError
+
+    def today(self, class_name: str, now: ClockSnapshot) -> EffectiveDay:
+        raise NotImplementedError
+
+    def day(self, class_name: str, day: str) -> Optional[List[Period]]:
+        raise NotImplementedError
+
+    def week(self, class_name: str) -> Optional[Dict[str, List[Period]]]:
+        raise NotImplementedError
+
+    def search(self, query: str, match: str = "substring",
+               class_name: Optional[str] = None, day: Optional[str] = None) -> List[Match]:
+        raise NotImplementedError
+
+# === Compiled JSON Index ===
+class IndexStore(TimetableStore):
+    """Answers from one compiled TimetableIndex, calendar overlay included."""
+
+    backend = "index"
+
+    def __init__(self, index: TimetableIndex):
+        self.index = index
+        self.timezone = index.timezone
+
+    @property
+    def version(self) -> str:
+        return self.index.version
+
+    @property
+    def classes(self) -> List[str]:
+        return self.index.classes
+
+    @property
+    def subjects(self) -> List[str]:
+        return self.index.subjects
+
+    def resolve_class(self, class_name: str) -> Optional[str]:
+        return self.index.resolve_class(class_name)
+
+    def timezone_for(self, class_name: str) -> str:
+        return self.index.timezone_for(class_name)
+
+    def is_weekly_off(self, class_name: str, day: str) -> bool:
+        return self.index.is_weekly_off(class_name, day)
+
+    def today(self, class_name: str, now: ClockSnapshot) -> EffectiveDay:
+        return self.index.effective_day(class_name, now.date, now.day)
+
+    def day(self, class_name: str, day: str) -> Optional[List[Period]]:
+        return self.index.get_schedule(class_name, day)
+
+    def week(self, class_name: str) -> Optional[Dict[str, List[Period]]]:
+        return self.index.get_week(class_name)
+
+    def search(self, query: str, match: str = "substring",
+               class_name: Optional[str] = None, day: Optional[str] = None) -> List[Match]:
+        return self.index.subject_index.search(query, match, class_name, day)
+
+_last_index_store: Optional[IndexStore] = None
+
+def store_for_index(index: TimetableIndex) -> IndexStore:
+    # One wrapper per live index, replaced when the reloader swaps in a new one.
+    global _last_index_store
+    store = _last_index_store
+    if store is None or store.index is not index:
+        store = _last_index_store = IndexStore(index)
+    return store
+
+# === SQLite ===
+# SQLite's bound-parameter limit is 999 on older builds; subject lookups go in batches below it.
+SUBJECT_BATCH = 500
+
+class _Revision(NamedTuple):
+    revision: int
+    classes: List[str]
+    class_keys: Dict[str, str]
+    subjects: List[Tuple[str, str, List[str]]]  # (subject, normalized, word tokens), sorted by subject
+    days: Dict[Tuple[str, str], Optional[DaySchedule]]
+
+class SqliteStore(TimetableStore):
+    """Answers from timetable.db through the covering (class, day, start_min) index.
+
+    The revision counter that database.py bumps on every write is read once
+    per call; class names, distinct subjects and compiled day schedules are
+    kept for the current revision and dropped as a whole when it moves. The
+    schema has no calendar, teachers or rooms, so dated exceptions do not
+    apply here.
+    """
+
+    backend = "sqlite"
+    blocking = True
+
+    def __init__(self, pool: ConnectionPool, timezone: str = DEFAULT_TIMEZONE,
+                 weekly_offs: Iterable[str] = ("Sunday",)):
+        self.pool = pool
+        self.timezone = timezone
+        self.weekly_offs = parse_weekly_offs(list(weekly_offs))
+        self._state = _Revision(-1, [], {}, [], {})
+
+    def _revision(self) -> _Revision:
+        conn = self.pool.connection()
+        revision = conn.execute("SELECT revision FROM timetable_revision").fetchone()[0]
+        state = self._state
+        if state.revision != revision:
+            # Classes in insertion order, which for an import is timetable.json order.
+            classes = [row[0] for row in conn.execute(
+                "SELECT class FROM timetable GROUP BY class ORDER BY min(id)"
+            )]
+            subjects = []
+            for (subject,) in conn.execute("SELECT DISTINCT subject FROM timetable ORDER BY subject"):
+                text = normalize_subject(subject)
+                subjects.append((subject, text, subject_tokens(text)))
+            # Swapped as a whole, like ResponseCache, so no reader mixes two revisions.
+            state = self._state = _Revision(
+                revision, classes, {normalize_class_name(c): c for c in classes}, subjects, {}
+            )
+        return state
+
+    @property
+    def version(self) -> str:
+        return f"sqlite-{self._revision().revision}"
+
+    @property
+    def classes(self) -> List[str]:
+        return self._revision().classes
+
+    @property
+    def subjects(self) -> List[str]:
+        return [subject for subject, _, _ in self._revision().subjects]
+
+    def resolve_class(self, class_name: str) -> Optional[str]:
+        return self._revision().class_keys.get(normalize_class_name(class_name))
+
+    def is_weekly_off(self, class_name: str, day: str) -> bool:
+        return day in self.weekly_offs
+
+    def _schedule(self, class_name: str, day: str) -> Optional[DaySchedule]:
+        state = self._revision()
+        key = (class_name, day)
+        if key not in state.days:
+            rows = self.pool.connection().execute("""
+                SELECT subject, start_min, end_min FROM timetable
+                WHERE class = ? AND day = ?
+                ORDER BY start_min
+            """, key).fetchall()
+            state.days[key] = DaySchedule(
+                [Period(subject, format_minutes(start), format_minutes(end)) for subject, start, end in rows],
+                [start for _, start, _ in rows],
+                [end for _, _, end in rows],
+            ) if rows else None
+        return state.days[key]
+
+    def today(self, class_name: str, now: ClockSnapshot) -> EffectiveDay:
+        if self.is_weekly_off(class_name, now.day):
+            return EffectiveDay(EMPTY_DAY, holiday=now.day)
+        return EffectiveDay(self._schedule(class_name, now.day) or EMPTY_DAY)
+
+    def day(self, class_name: str, day: str) -> Optional[List[Period]]:
+        schedule = self._schedule(class_name, day)
+        return schedule.periods if schedule is not None else None
+
+    def week(self, class_name: str) -> Optional[Dict[str, List[Period]]]:
+        if self.resolve_class(class_name) != class_name:
+            return None
+        week = {}
+        for day in DAYS:
+            schedule = self._schedule(class_name, day)
+            if schedule is not None:
+                week[day] = schedule.periods
+        return week
+
+    def search(self, query: str, match: str = "substring",
+               class_name: Optional[str] = None, day: Optional[str] = None) -> List[Match]:
+        # Match the cached distinct subjects with SubjectIndex's rules (normalised text,
+        # substring or word start), then read only those subjects' rows.
+        query = normalize_subject(query)
+        state = self._revision()
+        if match == "prefix":
+            subjects = [subject for subject, text, tokens in state.subjects
+                        if text.startswith(query) or any(t.startswith(query) for t in tokens)]
+        else:
+            subjects = [subject for subject, text, _ in state.subjects if query in text]
+        if not subjects:
+            return []
+        filters, params = "", []
+        if class_name is not None:
+            filters += " AND class = ?"
+            params.append(class_name)
+        if day is not None:
+            filters += " AND day = ?"
+            params.append(day)
+        conn = self.pool.connection()
+        rows = []
+        for i in range(0, len(subjects), SUBJECT_BATCH):
+            batch = subjects[i:i + SUBJECT_BATCH]
+            rows += conn.execute(f"""
+                SELECT id, class, day, subject, start_min, end_min FROM timetable
+                WHERE subject IN ({", ".join("?" * len(batch))}){filters}
+            """, batch + params).fetchall()
+        rows.sort()
+        return [(found_class, found_day, Period(subject, format_minutes(start), format_minutes(end)))
+                for _, found_class, found_day, subject, start, end in rows]
+
+# === Selection ===
+StoreProvider = Callable[[], TimetableStore]
+
+def open_store(backend: str, get_index: Callable[[], TimetableIndex],
+               pool: ConnectionPool = database_pool) -> StoreProvider:
+    if backend == "index":
+        return lambda: store_for_index(get_index())
+    if backend == "sqlite":
+        store = SqliteStore(pool, get_index().timezone)
+        return lambda: store
+    raise ValueError(f"Unknown timetable store {backend!r}; expected one of {', '.join(STORE_BACKENDS)}")
+
+_provider: Optional[StoreProvider] = None
+
+def use_store(provider: StoreProvider) -> None:
+    global _provider
+    _provider = provider
+
+def get_store() -> TimetableStore:
+    # Without a configured provider (the AI router mounted on its own) read timetable.db.
+    global _provider
+    if _provider is None:
+        store = SqliteStore(database_pool)
+        _provider = lambda: store
+    return _provider()
+
+async def read_store(fn: Callable[..., Any], *args: Any) -> Any:
+    # From async code: SQLite reads run on the DB executor, never on the event loop;
+    # the in-memory index answers inline.
+    if get_store().blocking:
+        return await db_executor.run(fn, *args)
+    return fn(*args)
@@ -0,0 +1,231 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from datetime import date
+import json
+import logging
+
+from free_slots import is_break
+from timetable_index import (
+    CALENDAR_KINDS, DAYS, TimetableIndex, iter_classes, normalize_class_name, normalize_day, parse_minutes
+)
+
+logger = logging.getLogger(__name__)
+
+ERROR = "error"
+WARNING = "warning"
+
+class Issue(NamedTuple):
+    level: str
+    class_name: str
+    day: Optional[str]
+    message: str
+
+    def __str__(self) -> str:
+        where = f"{self.class_name} {self.day}" if self.day else self.class_name
+        return f"{self.level}: {where}: {self.message}"
+
+class TimetableValidationError(ValueError):
+    def __init__(self, issues: List[Issue]):
+        self.issues = issues
+        errors = [i for i in issues if i.level == ERROR]
+        shown = "; ".join(str(i) for i in errors[:5])
+        more = f" (+{len(errors) - 5} more)" if len(errors) > 5 else ""
+        super().__init__(f"{len(errors)} timetable error(s): {shown}{more}")
+
+Row = Tuple[int, int, str]  # (start, end, subject) in minutes of the day
+
+def _minutes(value: Any) -> Optional[int]:
+    try:
+        minutes = parse_minutes(value)
+    except (AttributeError, ValueError):
+        return None
+    return minutes if 0 <= minutes <= 24 * 60 else None
+
+def _fmt(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def _break_specs(meta: Dict[str, Any]) -> Iterable[Tuple[str, Dict[str, Any]]]:
+    # "lunch_break", "short_break", ... ; both "end" and "end_time" are in use.
+    for key, spec in meta.items():
+        if key.endswith("_break") and isinstance(spec, dict):
+            yield key, spec
+
+# === Per Class-Day ===
+def check_day(class_name: str, day: str, periods: List[Dict[str, Any]], meta: Dict[str, Any]) -> List[Issue]:
+    issues: List[Issue] = []
+
+    def report(level: str, message: str) -> None:
+        issues.append(Issue(level, class_name, day, message))
+
+    rows: List[Row] = []
+    for position, period in enumerate(periods, 1):
+        if not isinstance(period, dict) or not period.get("subject"):
+            report(ERROR, f"period #{position} has no subject")
+            continue
+        for field in ("teacher", "room"):
+            if period.get(field) is not None and not isinstance(period[field], (str, int)):
+                report(ERROR, f"{period['subject']} has an invalid {field}")
+        start, end = _minutes(period.get("start_time")), _minutes(period.get("end_time"))
+        if start is None or end is None:
+            report(ERROR, f"{period['subject']} has an invalid time (expected HH:MM)")
+        elif end <= start:
+            report(ERROR, f"{period['subject']} ends at {period['end_time']}, not after it starts")
+        else:
+            rows.append((start, end, period["subject"]))
+
+    if any(rows[i][0] > rows[i + 1][0] for i in range(len(rows) - 1)):
+        report(ERROR, "periods are not sorted by start time")
+    rows.sort()
+
+    # One sweep over the sorted day: overlaps are errors, gaps between periods only warnings.
+    # `reach` is the period ending last so far, so a long period is checked against every later one.
+    reach: Optional[Row] = None
+    for row in rows:
+        if reach is not None:
+            start, end, subject = reach
+            if row[0] < end:
+                report(ERROR, f"{subject} ({_fmt(start)}-{_fmt(end)}) overlaps "
+                              f"{row[2]} ({_fmt(row[0])}-{_fmt(row[1])})")
+            elif row[0] > end:
+                report(WARNING, f"unscheduled gap {_fmt(end)}-{_fmt(row[0])}")
+        if reach is None or row[1] > reach[1]:
+            reach = row
+
+    if rows:
+        first, last = rows[0][0], max(end for _, end, _ in rows)
+        if _minutes(meta.get("start_time")) not in (None, first):
+            report(WARNING, f"first period starts at {_fmt(first)}, class start_time is {meta['start_time']}")
+        if _minutes(meta.get("end_time")) not in (None, last):
+            report(WARNING, f"last period ends at {_fmt(last)}, class end_time is {meta['end_time']}")
+
+        by_start = {start: (end, subject) for start, end, subject in rows}
+        for key, spec in _break_specs(meta):
+            start = _minutes(spec.get("start"))
+            end = _minutes(spec.get("end", spec.get("end_time")))
+            if start is None or end is None:
+                continue  # reported once per class by check_class
+            found = by_start.get(start)
+            if found is None:
+                report(ERROR, f"no period at {key} {_fmt(start)}-{_fmt(end)}")
+            elif found[0] != end:
+                report(ERROR, f"{key} ends at {_fmt(end)} but {found[1]} ends at {_fmt(found[0])}")
+            elif not is_break(found[1]):
+                report(WARNING, f"{key} {_fmt(start)}-{_fmt(end)} is scheduled as {found[1]}")
+    return issues
+
+# === Per Class ===
+def check_class(class_name: str, spec: Dict[str, Any]) -> List[Issue]:
+    issues: List[Issue] = []
+    for key, brk in _break_specs(spec):
+        start = _minutes(brk.get("start"))
+        end = _minutes(brk.get("end", brk.get("end_time")))
+        if start is None or end is None or end <= start:
+            issues.append(Issue(ERROR, class_name, None, f"{key} needs valid start and end times"))
+        elif "duration_minutes" in brk and brk["duration_minutes"] != end - start:
+            issues.append(Issue(ERROR, class_name, None,
+                                f"{key} duration_minutes is {brk['duration_minutes']}, times give {end - start}"))
+
+    seen: Dict[str, str] = {}
+    for day, periods in spec.get("daily_schedule", {}).items():
+        normalized = normalize_day(day)
+        if normalized not in DAYS:
+            issues.append(Issue(ERROR, class_name, day, "unknown day name"))
+            continue
+        if normalized in seen:
+            issues.append(Issue(ERROR, class_name, day, f"duplicates {seen[normalized]}"))
+            continue
+        seen[normalized] = day
+        if not isinstance(periods, list):
+            issues.append(Issue(ERROR, class_name, day, "schedule must be a list of periods"))
+            continue
+        issues += check_day(class_name, normalized, periods, spec)
+    return issues
+
+# === Calendar ===
+def check_entry(on: str, spec: Any, class_keys: Dict[str, str]) -> List[Issue]:
+    # Calendar periods are swept with the weekly rules; issues are reported under "calendar <date>".
+    if not isinstance(spec, dict):
+        return [Issue(ERROR, "calendar", on, "entry must be an object")]
+    kind = spec.get("type", "holiday")
+    if kind not in CALENDAR_KINDS:
+        return [Issue(ERROR, "calendar", on, f"unknown entry type {kind!r}, expected one of {', '.join(CALENDAR_KINDS)}")]
+    issues: List[Issue] = []
+
+    def report(message: str) -> None:
+        issues.append(Issue(ERROR, "calendar", on, f"{kind}: {message}"))
+
+    classes = spec.get("classes")
+    if classes is not None:
+        if not isinstance(classes, list) or not all(isinstance(name, str) for name in classes):
+            report("classes must be a list of class names")
+        else:
+            unknown = [name for name in classes if normalize_class_name(name) not in class_keys]
+            if unknown:
+                report(f"unknown class(es) {', '.join(unknown)}")
+    follow = spec.get("follow")
+    if follow is not None and (not isinstance(follow, str) or normalize_day(follow) not in DAYS):
+        report(f"follows unknown day {follow!r}")
+    if kind == "half_day" and _minutes(spec.get("end")) is None:
+        report("needs an end time (expected HH:MM)")
+    if kind in ("exam", "substitution"):
+        periods = spec.get("schedule" if kind == "exam" else "periods", [])
+        if not isinstance(periods, list):
+            report("periods must be a list")
+        else:
+            issues += check_day("calendar", f"{on} {kind}", periods, {})
+    return issues
+
+def check_calendar(calendar: Any, class_keys: Dict[str, str]) -> List[Issue]:
+    if not isinstance(calendar, dict):
+        return [Issue(ERROR, "calendar", None, "must map YYYY-MM-DD dates to entries")]
+    issues: List[Issue] = []
+    for on, specs in calendar.items():
+        try:
+            date.fromisoformat(on)
+        except (TypeError, ValueError):
+            issues.append(Issue(ERROR, "calendar", str(on), "date must be YYYY-MM-DD"))
+            continue
+        for spec in specs if isinstance(specs, list) else [specs]:
+            issues += check_entry(on, spec, class_keys)
+    return issues
+
+def validate_timetable(data: Dict[str, Any]) -> List[Issue]:
+    """Every issue in a timetable.json document; each class-day and calendar date is sorted and swept once."""
+    issues: List[Issue] = []
+    class_keys: Dict[str, str] = {}
+    for class_name, spec in iter_classes(data):
+        class_keys[normalize_class_name(class_name)] = class_name
+        issues += check_class(class_name, spec)
+    if "calendar" in data:
+        issues += check_calendar(data["calendar"], class_keys)
+    return issues
+
+def check_timetable(data: Dict[str, Any], source: str = "timetable") -> List[Issue]:
+    # Logs warnings and raises on any error, so bad data never gets compiled or published.
+    issues = validate_timetable(data)
+    for issue in issues:
+        if issue.level == WARNING:
+            logger.warning(f"{source}: {issue}")
+    if any(issue.level == ERROR for issue in issues):
+        raise TimetableValidationError(issues)
+    return issues
+
+def load_valid_index(path: str) -> TimetableIndex:
+    with open(path, "r") as f:
+        data = json.load(f)
+    check_timetable(data, path)
+    return TimetableIndex(data)
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Check timetable.json for overlaps, ordering and break mismatches.")
+    parser.add_argument("source", nargs="?", default="timetable.json")
+    args = parser.parse_args()
+    with open(args.source, "r") as f:
+        found = validate_timetable(json.load(f))
+    for issue in found:
+        print(f"{'❌' if issue.level == ERROR else '⚠️'} {issue}")
+    errors = sum(issue.level == ERROR for issue in found)
+    print(f"{'❌' if errors else '✅'} {errors} error(s), {len(found) - errors} warning(s)")
+    sys.exit(1 if errors else 0)